@@ -1,26 +1,109 @@
-from fastapi import APIRouter
-from models import Job
+import os
+import time
+import zlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Header
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from services.celery_app import celery_app
+from services.job_store import iter_job_blobs
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# inspect() is a broker broadcast that waits for every worker to reply;
+# admin dashboards poll it, so share one probe per TTL window
+INSPECT_TTL = float(os.environ.get("ADMIN_INSPECT_TTL", 10))
+INSPECT_TIMEOUT = float(os.environ.get("ADMIN_INSPECT_TIMEOUT", 1.0))
+_inspect_cache = {}  # probe name -> (monotonic ts, data)
+_inspect_lock = threading.Lock()
+# job listings are repetitive JSON and compress ~10x; the app has no compression middleware
+GZIP_LEVEL = int(os.environ.get("ADMIN_GZIP_LEVEL", 6))
+
+
+def _inspect(*methods):
+    # the broadcasts are independent, so wait for all of them at once rather than in turn
+    insp = celery_app.control.inspect(timeout=INSPECT_TIMEOUT)
+    with ThreadPoolExecutor(max_workers=len(methods)) as pool:
+        futures = {m: pool.submit(getattr(insp, m)) for m in methods}
+        return {m: f.result() or {} for m, f in futures.items()}
+
+
+def _cached_inspect(*methods):
+    hit = _inspect_cache.get(methods)
+    if hit and time.monotonic() - hit[0] < INSPECT_TTL:
+        return hit[1]
+    with _inspect_lock:
+        # another request may have refreshed it while we waited
+        hit = _inspect_cache.get(methods)
+        if not hit or time.monotonic() - hit[0] >= INSPECT_TTL:
+            hit = (time.monotonic(), _inspect(*methods))
+            _inspect_cache[methods] = hit
+        return hit[1]
+
+
+def _accepts_gzip(accept_encoding):
+    # honour q-values: "gzip;q=0" is an explicit refusal, and "*" covers gzip unless it is listed
+    star = 0.0
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        coding = coding.strip()
+        if coding == "gzip":
+            return q > 0
+        if coding == "*":
+            star = q
+    return star > 0
+
+
+def _gzip(chunks):
+    # one gzip member over the whole stream; zlib buffers internally and emits when it has output
+    z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
 
-router = APIRouter()
 
 @router.get("/admin/jobs")
-async def list_jobs():
-    jobs = Job.find_many(limit=200, skip=0)
-    return {"jobs": [j.to_dict() for j in jobs]}
+async def list_jobs(limit: int = 200, skip: int = 0, format: str = "json",
+                    accept_encoding: str = Header("")):
+    # stored records are already JSON, so stream them as-is instead of parse + re-dump
+    if format == "ndjson":
+        # one record per line, for clients that parse incrementally
+        def stream():
+            for blob in iter_job_blobs(limit=limit, skip=skip):
+                yield blob + b"\n"
+        media_type = "application/x-ndjson"
+    else:
+        def stream():
+            yield b'{"jobs":['
+            first = True
+            for blob in iter_job_blobs(limit=limit, skip=skip):
+                if not first:
+                    yield b","
+                yield blob
+                first = False
+            yield b"]}"
+        media_type = "application/json"
+    headers = {"Vary": "Accept-Encoding"}
+    if _accepts_gzip(accept_encoding):
+        headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(_gzip(stream()), media_type=media_type, headers=headers)
+    return StreamingResponse(stream(), media_type=media_type, headers=headers)
 
+# plain def: FastAPI runs these in its threadpool, so a cold probe never blocks the event loop
 @router.get("/admin/workers")
-async def workers():
-    insp = celery_app.control.inspect()
-    return {
-        "stats": insp.stats() or {},
-        "active": insp.active() or {},
-    }
+def workers():
+    return _cached_inspect("stats", "active")
 
 @router.get("/admin/queue")
-async def queue_info():
-    insp = celery_app.control.inspect()
-    return {
-        "reserved": insp.reserved() or {},
-        "scheduled": insp.scheduled() or {},
-    }
+def queue_info():
+    return _cached_inspect("reserved", "scheduled")
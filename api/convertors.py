@@ -0,0 +1,22 @@
+# api/convertors.py
+"""
+"{job_id:jobid}" path convertor. Only ids this service issues match it, so junk and
+"../" probes get a 404 from the router itself: no handler, no store or filesystem access.
+"""
+from starlette.convertors import Convertor, register_url_convertor
+
+# secrets.token_hex(16) ids, plus the dashed uuid4 strings issued before that
+JOB_ID_REGEX = r"[0-9a-f]{32}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+
+
+class JobIdConvertor(Convertor):
+    regex = JOB_ID_REGEX
+
+    def convert(self, value: str) -> str:
+        return value
+
+    def to_string(self, value: str) -> str:
+        return value
+
+
+register_url_convertor("jobid", JobIdConvertor())
@@ -1,33 +1,40 @@
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from models import Job  # update based on your ORM
-from services.queue import enqueue_render_job
+import api.convertors  # noqa: F401  registers the {job_id:jobid} path convertor
+from services.job_store import read_job, update_job
+from services.celery_app import enqueue_render_job
 from datetime import datetime
 import logging
 
 router = APIRouter()
 logger = logging.getLogger("render_routes")
 
-@router.get("/render/start/{job_id}")
+@router.get("/render/start/{job_id:jobid}")
 async def start_render(job_id: str, request: Request):
-    job = await Job.get(job_id)
+    job = await run_in_threadpool(read_job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    if job.status in ("started","parsing","rendering","completed"):
-        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    if job.get("status") in ("started","parsing","rendering","completed"):
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
 
-    job.status = "queued"
-    job.meta = job.meta or {}
-    job.meta["manual_started"] = True
-    job.meta["manual_started_at"] = datetime.utcnow().isoformat()
-    job.meta["manual_started_ip"] = request.client.host
-    await job.save()
+    # compare-and-set on the status checked above, so a worker update in between wins
+    patch = {
+        "status": "queued",
+        "meta": {
+            "manual_started": True,
+            "manual_started_at": datetime.utcnow().isoformat(),
+            "manual_started_ip": request.client.host,
+        },
+    }
+    if not await run_in_threadpool(update_job, job_id, patch, job.get("status")):
+        raise HTTPException(status_code=409, detail="Job status changed, retry")
 
-    enqueue_render_job(str(job.id))
+    await run_in_threadpool(enqueue_render_job, job_id)
 
     return JSONResponse({
         "ok": True,
-        "job_id": str(job.id),
-        "status": job.status
+        "job_id": job_id,
+        "status": "queued"
     })
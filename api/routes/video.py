@@ -1,17 +1,132 @@
 # api/routes/video.py
 # If you prefer route modularization (optional). Example FastAPI APIRouter.
 from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import uuid
-import json
+from typing import List
+import os
+import time
+import atexit
+import secrets
+import hashlib
+import queue
+import logging
+import threading
+import orjson
 from pathlib import Path
+from types import MappingProxyType
 from datetime import datetime
-import os
+from email.utils import formatdate, parsedate_to_datetime
+
+import api.convertors  # noqa: F401  registers the {job_id:jobid} path convertor
+from services.job_store import peek_job, write_job, write_jobs, update_job, delete_job
+
+router = APIRouter(default_response_class=ORJSONResponse)
+logger = logging.getLogger("visora_api")
+
+OUTPUT_DIR = Path(__file__).resolve().parent.parent.parent / "public" / "videos"
+BASE_URL = os.environ.get("BASE_URL", "")
+
+# Bodies for the misses that bots and stale clients hit most, serialised once at import;
+# same {"detail": ...} shape HTTPException would produce
+_JOB_NOT_FOUND = orjson.dumps({"detail": "Job not found"})
+_VIDEO_NOT_FOUND = orjson.dumps({"detail": "Video not found"})
+
+# Behind nginx, let the proxy sendfile() the mp4 instead of streaming it through
+# the worker. nginx side:
+#   location /internal-videos/ { internal; alias /app/public/videos/; sendfile on; tcp_nopush on; }
+USE_XACCEL = os.environ.get("USE_XACCEL", "0") == "1"
+XACCEL_PREFIX = os.environ.get("XACCEL_PREFIX", "/internal-videos/")
+
+# Broker publishes run on a background thread so /create-video never waits on
+# Redis round-trips; the route only drops the job id into this queue.
+# The thread publishes in batches (up to ENQUEUE_MAX_BATCH ids, or whatever
+# arrived within ENQUEUE_MAX_WAIT seconds) over a single producer connection.
+ENQUEUE_MAX_BATCH = 32
+ENQUEUE_MAX_WAIT = 0.05
+# If the broker is down or slow the backlog stays bounded: past this many
+# unpublished ids, /create-video answers 429 instead of growing the queue.
+ENQUEUE_QUEUE_MAX = int(os.environ.get("ENQUEUE_QUEUE_MAX", 1000))
+_ENQUEUE_Q: "queue.Queue[str]" = queue.Queue(maxsize=ENQUEUE_QUEUE_MAX)
+_enqueue_thread = None
+_enqueue_lock = threading.Lock()
+
+
+def _mark_enqueued(jid: str, ok: bool):
+    # patches, not read/write: the worker may already be updating this job
+    if ok:
+        # no-op once the worker has picked it up
+        update_job(jid, {"status": "queued"}, if_status="created")
+    else:
+        update_job(jid, {"meta": {"enqueue_error": True}})
+
+
+def _next_batch():
+    batch = [_ENQUEUE_Q.get()]
+    deadline = time.monotonic() + ENQUEUE_MAX_WAIT
+    while len(batch) < ENQUEUE_MAX_BATCH:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_ENQUEUE_Q.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _enqueue_worker():
+    publish = None  # imported on the first batch, then reused for every later one
+    while True:
+        batch = _next_batch()
+        try:
+            if publish is None:
+                from services.celery_app import enqueue_render_jobs as publish
+            task_ids = publish(batch)
+        except Exception:
+            logger.exception("Failed to enqueue %d jobs", len(batch))
+            task_ids = {}
+        for jid in batch:
+            _mark_enqueued(jid, task_ids.get(jid) is not None)
+
+
+def _drain_enqueue_queue():
+    # the enqueue thread is a daemon and dies with the process: publish whatever
+    # is still waiting so those jobs aren't left in "created" forever
+    pending = []
+    while True:
+        try:
+            pending.append(_ENQUEUE_Q.get_nowait())
+        except queue.Empty:
+            break
+    if not pending:
+        return
+    try:
+        from services.celery_app import enqueue_render_jobs
+        task_ids = enqueue_render_jobs(pending)
+    except Exception:
+        logger.exception("Failed to enqueue %d jobs at shutdown", len(pending))
+        task_ids = {}
+    for jid in pending:
+        _mark_enqueued(jid, task_ids.get(jid) is not None)
 
-router = APIRouter()
 
-JOBS_DIR = Path(__file__).resolve().parent.parent / "jobs"
-JOBS_DIR.mkdir(parents=True, exist_ok=True)
+def _ensure_enqueue_worker():
+    global _enqueue_thread
+    if _enqueue_thread is not None:
+        return
+    with _enqueue_lock:
+        if _enqueue_thread is None:
+            t = threading.Thread(target=_enqueue_worker, name="visora-enqueue", daemon=True)
+            t.start()
+            atexit.register(_drain_enqueue_queue)
+            _enqueue_thread = t
+
+MAX_SCRIPT_CHARS = int(os.environ.get("MAX_SCRIPT_CHARS", 20000))
+# comma-separated; empty means any preset is accepted
+ALLOWED_PRESETS = frozenset(p.strip() for p in os.environ.get("ALLOWED_PRESETS", "").split(",") if p.strip())
+MAX_BULK_JOBS = int(os.environ.get("MAX_BULK_JOBS", 100))
 
 class CreateVideoSchema(BaseModel):
     script: str
@@ -19,27 +134,249 @@ class CreateVideoSchema(BaseModel):
     avatar: str = None
     meta: dict = {}
 
-@router.post("/create-video")
-async def create_video(body: CreateVideoSchema):
+def _validate_request(body: CreateVideoSchema, where: str = ""):
     if not body.script or not body.script.strip():
-        raise HTTPException(status_code=400, detail="script is required")
-    jid = str(uuid.uuid4())
-    job = {
-        "id": jid,
+        raise HTTPException(status_code=400, detail=f"{where}script is required")
+    # reject here what the worker would only fail on later, after taking a render slot
+    if len(body.script) > MAX_SCRIPT_CHARS:
+        raise HTTPException(status_code=413, detail=f"{where}script exceeds {MAX_SCRIPT_CHARS} characters")
+    if ALLOWED_PRESETS and body.preset not in ALLOWED_PRESETS:
+        raise HTTPException(status_code=400, detail=f"{where}unknown preset: {body.preset}")
+
+
+def _new_job(body: CreateVideoSchema, status: str) -> dict:
+    return {
+        "id": secrets.token_hex(16),  # 32 hex chars, same shape as uuid4().hex
         "script_text": body.script,
         "preset": body.preset,
         "avatar": body.avatar,
         "meta": body.meta,
-        "status": "created",
+        "status": status,
         "created_at": datetime.utcnow().isoformat()
     }
-    p = JOBS_DIR / f"{jid}.json"
-    with open(p, "w", encoding="utf-8") as f:
-        json.dump(job, f, ensure_ascii=False, indent=2)
-    # enqueue via celery if available
+
+
+@router.post("/create-video")
+async def create_video(body: CreateVideoSchema):
+    _validate_request(body)
+    job = _new_job(body, "created")
+    jid = job["id"]
+    # the store write is blocking disk / sqlite / redis I/O; keep it off the event loop
+    await run_in_threadpool(write_job, job)
+    # enqueue via celery in the background
+    _ensure_enqueue_worker()
     try:
-        from services.celery_app import enqueue_render_job
-        enqueue_render_job(jid)
-    except Exception:
-        pass
+        _ENQUEUE_Q.put_nowait(jid)
+    except queue.Full:
+        await run_in_threadpool(delete_job, jid)
+        raise HTTPException(status_code=429, detail="Render queue is full, retry later",
+                            headers={"Retry-After": "5"})
     return {"ok": True, "job_id": jid, "status": "created"}
+
+
+class CreateVideosSchema(BaseModel):
+    jobs: List[CreateVideoSchema]
+
+
+def _publish_bulk(jobs: list) -> dict:
+    from services.celery_app import enqueue_render_jobs
+    # one store batch, then every task over one producer connection
+    write_jobs(jobs)
+    try:
+        task_ids = enqueue_render_jobs([j["id"] for j in jobs])
+    except Exception:
+        logger.exception("Failed to enqueue %d jobs", len(jobs))
+        task_ids = {}
+    if not any(task_ids.get(j["id"]) for j in jobs):
+        # nothing was published (broker down): drop the records, the client retries the batch
+        for job in jobs:
+            delete_job(job["id"])
+        return task_ids
+    for job in jobs:
+        if task_ids.get(job["id"]) is None:
+            job["status"] = "failed"
+            update_job(job["id"], {"status": "failed", "error": "enqueue failed"})
+    return task_ids
+
+
+@router.post("/create-videos")
+async def create_videos(body: CreateVideosSchema):
+    if not body.jobs:
+        raise HTTPException(status_code=400, detail="jobs is required")
+    if len(body.jobs) > MAX_BULK_JOBS:
+        raise HTTPException(status_code=413, detail=f"at most {MAX_BULK_JOBS} jobs per request")
+    for i, item in enumerate(body.jobs):
+        _validate_request(item, f"jobs[{i}]: ")
+    # published synchronously below, so the records start out as "queued"; the
+    # request is already a batch and gains nothing from the single-job batcher
+    jobs = [_new_job(item, "queued") for item in body.jobs]
+    task_ids = await run_in_threadpool(_publish_bulk, jobs)
+    if not any(task_ids.values()):
+        raise HTTPException(status_code=503, detail="Render queue is unavailable, retry later",
+                            headers={"Retry-After": "5"})
+    return {"ok": True, "jobs": [{"job_id": j["id"], "status": j["status"]} for j in jobs]}
+
+
+# built once at import; /job/{id} is polled every second or two per client
+_STAGE_PROGRESS = MappingProxyType({
+    "created": 0,
+    "queued": 5,
+    "started": 10,
+    "parsing": 20,
+    "rendering": 50,
+    "completed": 100,
+})
+
+
+def get_progress_from_job(job: dict) -> int:
+    status = job.get("status")
+    if status == "completed":
+        return 100
+    p = job.get("progress")
+    if isinstance(p, int):
+        return max(0, min(100, p))
+    return _STAGE_PROGRESS.get(status or "", 0)
+
+
+def job_response(job: dict) -> dict:
+    job_id = job["id"]
+    status = job.get("status")
+    video_url = (job.get("result") or {}).get("video_url")
+    # only a completed job can have an mp4 on disk; skip the stat while it is still running
+    if video_url is None and status == "completed" and (OUTPUT_DIR / f"{job_id}.mp4").exists():
+        video_url = f"{BASE_URL}/public/videos/{job_id}.mp4"
+    return {
+        "id": job_id,
+        "status": status,
+        "progress": get_progress_from_job(job),
+        "video_url": video_url,
+        "error": job.get("error"),
+    }
+
+@router.get("/job/{job_id:jobid}")
+async def get_job(job_id: str, if_none_match: str = Header(None)):
+    # redis/sqlite reads are blocking I/O (and lock waits); keep them off the event loop
+    job = await run_in_threadpool(peek_job, job_id)
+    if not job:
+        return Response(_JOB_NOT_FOUND, status_code=404, media_type="application/json")
+    body = orjson.dumps(job_response(job))
+    # clients poll this every second or two; most polls see no change and get a bare 304.
+    # no-cache rather than immutable even once completed: the S3 upload swaps video_url later
+    headers = {
+        "ETag": f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"',
+        "Cache-Control": "no-cache",
+    }
+    if if_none_match is not None and _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+DOWNLOAD_CHUNK = 1024 * 1024
+
+
+class VideoFileResponse(FileResponse):
+    # Starlette reads 64 KB per send; renders are hundreds of MB, so use 1 MB reads
+    # to cut the Python-level read/send round trips 16x when nginx isn't in front
+    chunk_size = DOWNLOAD_CHUNK
+
+
+def _parse_range(header: str, size: int):
+    """
+    Single 'bytes=start-end' / 'bytes=start-' / 'bytes=-suffix' range -> (start, end) inclusive.
+    None when the header should be ignored (multi-range, other units); ValueError when unsatisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _file_etag(st: os.stat_result) -> str:
+    # size + mtime_ns identify a render; no hashing, and the same on every worker
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # weak comparison, as If-None-Match requires
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+def _not_modified_since(header: str, st: os.stat_result) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(st.st_mtime) <= since
+
+
+def _iter_file(path: Path, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(DOWNLOAD_CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@router.get("/download/{job_id:jobid}")
+async def download_video(job_id: str, range: str = Header(None), if_range: str = Header(None),
+                         if_none_match: str = Header(None), if_modified_since: str = Header(None)):
+    file_path = OUTPUT_DIR / f"{job_id}.mp4"
+    try:
+        st = file_path.stat()
+    except FileNotFoundError:
+        return Response(_VIDEO_NOT_FOUND, status_code=404, media_type="application/json")
+    if USE_XACCEL:
+        return Response(media_type="video/mp4", headers={
+            "X-Accel-Redirect": f"{XACCEL_PREFIX}{job_id}.mp4",
+            "Content-Disposition": f'attachment; filename="{job_id}.mp4"',
+        })
+    etag = _file_etag(st)
+    headers = {
+        "Accept-Ranges": "bytes",
+        # finished renders never change, so clients may cache them
+        "Cache-Control": "public, max-age=3600",
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+    }
+    # conditional GET: a client that already has this render gets a bodiless 304
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        fresh = if_modified_since is not None and _not_modified_since(if_modified_since, st)
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    # If-Range: only resume when the client's copy is this exact file
+    if range and (if_range is None or if_range.strip() == etag):
+        # resumed / seeking downloads only get the bytes they ask for
+        try:
+            span = _parse_range(range, st.st_size)
+        except ValueError:
+            raise HTTPException(status_code=416, detail="Range not satisfiable",
+                                headers={"Content-Range": f"bytes */{st.st_size}"})
+        if span:
+            start, end = span
+            headers.update({
+                "Content-Range": f"bytes {start}-{end}/{st.st_size}",
+                "Content-Length": str(end - start + 1),
+                "Content-Disposition": f'attachment; filename="{job_id}.mp4"',
+            })
+            return StreamingResponse(_iter_file(file_path, start, end - start + 1),
+                                     status_code=206, media_type="video/mp4", headers=headers)
+    # the stat above feeds Content-Length / ETag / Last-Modified, so FileResponse doesn't stat again
+    return VideoFileResponse(
+        file_path, media_type="video/mp4", filename=f"{job_id}.mp4", stat_result=st, headers=headers,
+    )
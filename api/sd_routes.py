@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+import os
+import hmac
+import time
+import base64
+import hashlib
+import logging
+import orjson
+import redis
+
+router = APIRouter()
+logger = logging.getLogger("sd_routes")
+
+REDIS_URL = os.environ.get("REDIS_URL") or os.environ.get("CELERY_BROKER_URL") or "redis://localhost:6379/0"
+_redis = redis.Redis.from_url(REDIS_URL)
+
+# The webhook is public, and the worker downloads whatever `output` URL it is handed,
+# so every callback must be authenticated. Either:
+#   SD_WEBHOOK_SECRET  Replicate's signing secret (whsec_...); verifies webhook-signature
+#   SD_WEBHOOK_TOKEN   shared token that engine/sd_api.py appends to the callback URL (?token=)
+# With neither set, callbacks are refused and the worker falls back to polling.
+SD_WEBHOOK_SECRET = os.environ.get("SD_WEBHOOK_SECRET", "")
+SD_WEBHOOK_TOKEN = os.environ.get("SD_WEBHOOK_TOKEN", "")
+SD_WEBHOOK_MAX_BYTES = int(os.environ.get("SD_WEBHOOK_MAX_BYTES", 1024 * 1024))
+# how far webhook-timestamp may be from now, against replayed callbacks
+SD_WEBHOOK_TOLERANCE = 300
+
+
+def _valid_signature(headers, body: bytes) -> bool:
+    msg_id = headers.get("webhook-id", "")
+    ts = headers.get("webhook-timestamp", "")
+    sigs = headers.get("webhook-signature", "")
+    try:
+        if abs(time.time() - int(ts)) > SD_WEBHOOK_TOLERANCE:
+            return False
+        key = base64.b64decode(SD_WEBHOOK_SECRET.split("_", 1)[-1])
+    except ValueError:
+        return False
+    expected = base64.b64encode(
+        hmac.new(key, f"{msg_id}.{ts}.".encode("utf-8") + body, hashlib.sha256).digest()
+    ).decode("ascii")
+    # space-separated "v1,<base64>" entries; any one may match (secret rotation)
+    return any(hmac.compare_digest(sig.partition(",")[2], expected) for sig in sigs.split())
+
+
+def _authorized(request: Request, body: bytes) -> bool:
+    if SD_WEBHOOK_SECRET:
+        return _valid_signature(request.headers, body)
+    if SD_WEBHOOK_TOKEN:
+        return hmac.compare_digest(request.query_params.get("token", ""), SD_WEBHOOK_TOKEN)
+    return False
+
+
+async def _read_body(request: Request):
+    # bounded read: chunked bodies carry no Content-Length to check up front
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > SD_WEBHOOK_MAX_BYTES:
+        return None
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > SD_WEBHOOK_MAX_BYTES:
+            return None
+    return bytes(body)
+
+@router.post("/sd/webhook")
+async def sd_webhook(request: Request):
+    """
+    Completion callback for Stable Diffusion predictions (see engine/sd_api.py).
+    Hands the prediction body to the worker blocked on sd:done:<id>.
+    """
+    body = await _read_body(request)
+    if body is None:
+        return JSONResponse({"ok": False, "error": "body too large"}, status_code=413)
+    if not _authorized(request, body):
+        return JSONResponse({"ok": False, "error": "unauthorized"}, status_code=401)
+    # parse the bytes we already hold (request.json() would decode them again with stdlib json)
+    try:
+        pred = orjson.loads(body) if body else None
+    except orjson.JSONDecodeError:
+        pred = None
+    if not isinstance(pred, dict):
+        return JSONResponse({"ok": False, "error": "invalid json"}, status_code=400)
+    pred_id = pred.get("id")
+    if not pred_id:
+        return JSONResponse({"ok": False, "error": "missing id"}, status_code=400)
+
+    key = f"sd:done:{pred_id}"
+    pipe = _redis.pipeline()
+    pipe.rpush(key, body)
+    # the waiter gives up after SD_WEBHOOK_WAIT; don't leave orphans behind
+    pipe.expire(key, 600)
+    pipe.execute()
+    logger.info("SD prediction %s finished: %s", pred_id, pred.get("status"))
+    return {"ok": True}
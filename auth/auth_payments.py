@@ -105,7 +105,7 @@ def require_auth(fn):
 # ---------------------------
 @bp.route("/auth/register", methods=["POST"])
 def register():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     email = (data.get("email") or "").strip().lower()
     password = data.get("password", "")
     name = data.get("name", "")
@@ -130,7 +130,7 @@ def register():
 
 @bp.route("/auth/login", methods=["POST"])
 def login():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     email = (data.get("email") or "").strip().lower()
     password = data.get("password", "")
     user = users_col.find_one({"email": email})
@@ -142,7 +142,7 @@ def login():
 
 @bp.route("/auth/refresh", methods=["POST"])
 def refresh():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     token = data.get("refresh_token")
     payload = decode_token(token)
     if not payload or payload.get("type")!="refresh":
@@ -182,7 +182,7 @@ def consume_credits(user_id, amount):
 @bp.route("/consume", methods=["POST"])
 @require_auth
 def consume():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     amount = int(data.get("amount", 1))
     user = request.current_user
     ok = consume_credits(user["_id"], amount)
@@ -204,7 +204,7 @@ def consume():
 @bp.route("/pay/razorpay/create_order", methods=["POST"])
 @require_auth
 def razorpay_create_order():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     amount_in_rupees = float(data.get("amount_rupees", 99))  # amount in INR
     credits = int(data.get("credits", 100))
     if not rz_client:
@@ -235,7 +235,7 @@ def razorpay_webhook():
         expected = hmac.new(secret.encode(), payload, hashlib.sha256).hexdigest()
         if not hmac.compare_digest(expected, signature):
             return jsonify({"error":"invalid signature"}), 400
-    event = request.json
+    event = request.get_json(silent=True) or {}
     # handle payment.captured
     if event.get("event") == "payment.captured":
         payment = event["payload"]["payment"]["entity"]
@@ -253,7 +253,7 @@ def razorpay_webhook():
 @bp.route("/pay/stripe/create_session", methods=["POST"])
 @require_auth
 def stripe_create_session():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     amount_usd = float(data.get("amount_usd", 1.99))
     credits = int(data.get("credits", 100))
     # create product/session on Stripe Checkout
@@ -335,7 +335,7 @@ def admin_list_users():
 @require_auth
 @admin_required
 def admin_add_credits():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     user_id = data.get("user_id")
     amount = int(data.get("amount",0))
     if not user_id or amount<=0:
@@ -355,7 +355,7 @@ def admin_list_refunds():
 @require_auth
 @admin_required
 def admin_mark_refunded():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     pay_id = data.get("payment_id")
     payments_col.update_one({"_id": pay_id}, {"$set": {"status":"refunded"}})
     return jsonify({"ok": True})
@@ -365,7 +365,7 @@ def admin_mark_refunded():
 # ---------------------------
 @bp.route("/util/create_admin", methods=["POST"])
 def util_create_admin():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     secret = os.getenv("ADMIN_CREATE_SECRET")
     if data.get("secret") != secret:
         return jsonify({"error":"forbidden"}), 403
@@ -7,6 +7,7 @@ import numpy as np
 from scipy.io.wavfile import write as wav_write
 from pydub import AudioSegment
 from datetime import datetime
+from engine.downloads import download_file
 
 # Optional replicate fallback
 try:
@@ -278,5 +279,5 @@ def replicate_generate_music(prompt="cinematic score", duration=10):
     # expected output is URL to audio
     out_url = output[0] if isinstance(output, list) else output
     out_path = os.path.join(ROOT_STATIC, f"music_cloud_{uuid.uuid4().hex[:8]}.mp3")
-    os.system(f"wget {out_url} -O {out_path}")
+    download_file(out_url, out_path)
     return out_path
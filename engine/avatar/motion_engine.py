@@ -1,6 +1,6 @@
 import replicate
 import uuid
-import os
+from engine.downloads import download_file
 from engine.avatar.emotion_engine import emotion_settings
 
 def generate_motion_avatar(face_img, audio_file, emotion):
@@ -25,6 +25,6 @@ def generate_motion_avatar(face_img, audio_file, emotion):
     video_id = str(uuid.uuid4())[:8]
     save_path = f"static/videos/motion_{video_id}.mp4"
 
-    os.system(f"wget {video_url} -O {save_path}")
+    download_file(video_url, save_path)
 
     return save_path
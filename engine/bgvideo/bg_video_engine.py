@@ -1,6 +1,6 @@
 import replicate
 import uuid
-import os
+from engine.downloads import download_file
 
 def generate_ai_background(prompt="cinematic background, bokeh lights, professional reel style"):
     """
@@ -25,6 +25,6 @@ def generate_ai_background(prompt="cinematic background, bokeh lights, professio
     video_url = output["video"]
     save_path = f"static/videos/bg_{uuid.uuid4().hex[:8]}.mp4"
 
-    os.system(f"wget {video_url} -O {save_path}")
+    download_file(video_url, save_path)
 
     return save_path
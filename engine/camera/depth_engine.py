@@ -3,6 +3,7 @@ import os
 import numpy as np
 import cv2
 import uuid
+from engine.downloads import download_file
 
 # Optional: Replicate cloud model usage (higher quality). Requires REPLICATE_API_TOKEN env var.
 try:
@@ -36,7 +37,7 @@ def estimate_depth_replicate(image_path):
     # output is expected URL - download
     out_url = output[0] if isinstance(output, list) else output
     out_path = f"static/temp/depth_{uuid.uuid4().hex[:8]}.png"
-    os.system(f"wget {out_url} -O {out_path}")
+    download_file(out_url, out_path)
     return out_path
 
 def create_parallax_video(foreground_video, depth_map_path, strength=0.15):
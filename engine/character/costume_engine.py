@@ -1,5 +1,6 @@
 # engine/character/costume_engine.py
-import os, uuid, requests
+import uuid
+from engine.downloads import download_file
 import replicate
 from dotenv import load_dotenv
 load_dotenv()
@@ -32,5 +33,5 @@ def generate_costume_image(preset_name):
     # output often an URL list
     img_url = output[0] if isinstance(output, list) else output
     out_path = f"static/uploads/outfit_{preset_name}_{uuid.uuid4().hex[:6]}.png"
-    os.system(f"wget {img_url} -O {out_path}")
+    download_file(img_url, out_path)
     return out_path
@@ -1,11 +1,33 @@
 # engine/character/fullbody_engine.py
 import replicate
 import uuid, os
+from engine.downloads import download_file
 from dotenv import load_dotenv
 load_dotenv()
-import time
 
 REPLICATE = True
+URL_PREFIXES = ("http://", "https://")
+
+def _first_url(output):
+    """
+    First URL in a model output, in document order: a bare string, a list of
+    URLs, or {"output": [...]} nested however deep. Iterative, no recursion.
+    """
+    stack = [output]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, str):
+            if cur.startswith(URL_PREFIXES):
+                return cur
+        elif isinstance(cur, dict):
+            stack.extend(reversed(list(cur.values())))
+        elif isinstance(cur, (list, tuple)):
+            stack.extend(reversed(cur))
+        elif getattr(cur, "url", None):
+            # replicate FileOutput
+            return str(cur.url)
+    return None
+
 def generate_fullbody_animation(face_img_path, audio_path, pose="idle", style="realistic", outfit_image=None, hair_style=None):
     """
     Uses a cloud model (Replicate) to generate full-body animated video.
@@ -38,20 +60,11 @@ def generate_fullbody_animation(face_img_path, audio_path, pose="idle", style="r
     # run replicate (may take time)
     output = replicate.run(model_id, input=input_obj)
     # output expected to contain an URL to the video
-    video_url = None
-    if isinstance(output, dict) and "output" in output:
-        # some models return dict with output list
-        video_url = output["output"][0]
-    elif isinstance(output, list):
-        video_url = output[0]
-    elif isinstance(output, str):
-        video_url = output
+    video_url = _first_url(output)
 
     if not video_url:
         raise RuntimeError("No video output from model")
 
     out_fname = f"static/videos/fullbody_{uuid.uuid4().hex[:8]}.mp4"
-    os.system(f"wget {video_url} -O {out_fname}")
-    # small wait to ensure completion if needed
-    time.sleep(1)
+    download_file(video_url, out_fname)
     return out_fname
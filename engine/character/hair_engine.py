@@ -1,5 +1,6 @@
 # engine/character/hair_engine.py
-import replicate, uuid, os
+import replicate, uuid
+from engine.downloads import download_file
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -22,5 +23,5 @@ def generate_hair_image(style_name):
     out = replicate.run(model, input={"prompt": prompt, "width":512, "height":512})
     img_url = out[0] if isinstance(out,list) else out
     out_path = f"static/uploads/hair_{style_name}_{uuid.uuid4().hex[:6]}.png"
-    os.system(f"wget {img_url} -O {out_path}")
+    download_file(img_url, out_path)
     return out_path
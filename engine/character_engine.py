@@ -19,6 +19,7 @@ import uuid
 import json
 import shutil
 import time
+import functools
 from pathlib import Path
 from typing import Dict, Any, Optional
 
@@ -37,6 +38,25 @@ if not log.handlers:
     log.addHandler(ch)
 
 
+# optional TTF for placeholder labels; PIL's bitmap default when unset or unreadable
+PLACEHOLDER_FONT = os.environ.get("PLACEHOLDER_FONT", "")
+PLACEHOLDER_FONT_SIZE = int(os.environ.get("PLACEHOLDER_FONT_SIZE", 24))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_font(path: str, size: int):
+    """Parse a font once per worker process; every later frame and request reuses it."""
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            log.warning("Font %s unavailable, using PIL default", path)
+    try:
+        return ImageFont.load_default()
+    except Exception:
+        return None
+
+
 class CharacterEngineError(Exception):
     pass
 
@@ -182,7 +202,7 @@ class CharacterEngine:
         # try to write mp4 using moviepy to avoid requiring ffmpeg CLI in code
         try:
             from moviepy.editor import ImageSequenceClip
-            frame_files = sorted([str(p) for p in frames_dir.glob("*.png")])
+            frame_files = sorted([str(p) for p in frames_dir.glob("*.bmp")])
             clip = ImageSequenceClip(frame_files, fps=fps)
             clip.write_videofile(str(out_mp4), codec="libx264", audio=False, verbose=False, logger=None)
             clip.close()
@@ -199,20 +219,19 @@ class CharacterEngine:
     # -------------------------
     def _create_placeholder_frames(self, out_dir: Path, text: str, n: int, size=(720,1280)):
         """
-        Make simple PNG frames labelled with character name + frame number.
+        Make simple frames labelled with character name + frame number.
+        Saved as BMP: they are read back once by the encoder, and an uncompressed
+        write skips zlib entirely (PNG deflate dominated this loop).
         """
         out_dir.mkdir(parents=True, exist_ok=True)
         w, h = size
+        fnt = _load_font(PLACEHOLDER_FONT, PLACEHOLDER_FONT_SIZE)
         for i in range(n):
             img = Image.new("RGB", (w,h), color=(int(255*(i/n)), 40, 80))
             draw = ImageDraw.Draw(img)
-            try:
-                fnt = ImageFont.load_default()
-            except Exception:
-                fnt = None
             draw.text((20,20), f"{text} - frame {i+1}/{n}", fill=(255,255,255), font=fnt)
             draw.text((20,h-40), f"uid:{uuid.uuid4().hex[:6]}", fill=(255,255,255), font=fnt)
-            img.save(out_dir / f"frame_{i:04d}.png")
+            img.save(out_dir / f"frame_{i:04d}.bmp")
 
     # -------------------------
     # Simple CLI test
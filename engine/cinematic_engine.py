@@ -21,21 +21,33 @@ This file is intentionally verbose & documented so you can extend quickly.
 
 import os
 import shutil
+import subprocess
 import uuid
 import logging
 from pathlib import Path
 from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
 
 # Video assembly
-from moviepy.editor import VideoFileClip, concatenate_videoclips, AudioFileClip, CompositeAudioClip
+from moviepy.editor import VideoFileClip, concatenate_videoclips
 
 # Utilities
-from PIL import Image
+from PIL import Image, ImageDraw
 import numpy as np
 import tempfile
 import json
 import time
 
+# H.264 encoder (NVENC / QuickSync when the host has one, else libx264 "veryfast"),
+# probed against the same ffmpeg binary used below
+from engine.video_encoder import FFMPEG_BIN, video_encoder, encoder_preset, h264_args, h264_quality_args
+# ffprobe sits next to a system ffmpeg; imageio-ffmpeg ships none, so fall back to PATH
+_ffprobe_sibling = Path(FFMPEG_BIN).with_name("ffprobe")
+FFPROBE_BIN = str(_ffprobe_sibling) if _ffprobe_sibling.is_file() else "ffprobe"
+# stream parameters that must agree across clips for a stream-copy concat to be valid
+_CONCAT_STREAM_KEYS = ("codec_type", "codec_name", "profile", "width", "height", "pix_fmt",
+                       "r_frame_rate", "time_base", "sample_rate", "channels")
+
 # Configure logger
 logger = logging.getLogger("CinematicEngine")
 logger.setLevel(logging.INFO)
@@ -45,6 +57,13 @@ if not logger.handlers:
     logger.addHandler(ch)
 
 
+# scenes rendered concurrently per project
+SCENE_WORKERS = int(os.environ.get("SCENE_WORKERS", min(4, os.cpu_count() or 1)))
+# scene audio (TTS / voice, network- or model-bound) runs here while frames render;
+# threads start lazily on first submit
+_AUDIO_POOL = ThreadPoolExecutor(max_workers=SCENE_WORKERS, thread_name_prefix="scene-audio")
+
+
 class CinematicEngineError(Exception):
     pass
 
@@ -57,6 +76,8 @@ class CinematicEngine:
         """
         self.work_dir = Path(work_dir or "./tmp_cinematic_engine").absolute()
         self.debug = debug
+        # scene clips that carry an audio track (stream-copy concat needs all or none)
+        self._clips_with_audio = set()
         self._ensure_dirs()
         if self.debug:
             logger.setLevel(logging.DEBUG)
@@ -86,7 +107,7 @@ class CinematicEngine:
         :return: path to final mp4
         """
         start = time.time()
-        project_id = project.get("id", str(uuid.uuid4()))
+        project_id = project.get("id") or uuid.uuid4().hex
         project_dir = self.work_dir / project_id
         project_dir.mkdir(parents=True, exist_ok=True)
         logger.info("Rendering project %s → %s", project.get("title", "<untitled>"), project_dir)
@@ -95,11 +116,17 @@ class CinematicEngine:
         if not scenes:
             raise CinematicEngineError("Project has no scenes")
 
-        rendered_clips = []
-        for i, scene in enumerate(scenes):
+        # scenes are independent until assembly; each one spends most of its time in
+        # ffmpeg subprocesses and PIL encoders (both outside the GIL), so a thread pool
+        # overlaps them well
+        def _render(i_scene):
+            i, scene = i_scene
             logger.info("Rendering scene %d/%d id=%s", i+1, len(scenes), scene.get("id"))
-            clip_path = self.render_scene(scene, project_dir, index=i)
-            rendered_clips.append(clip_path)
+            return self.render_scene(scene, project_dir, index=i)
+
+        workers = max(1, min(SCENE_WORKERS, len(scenes)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scene") as pool:
+            rendered_clips = list(pool.map(_render, enumerate(scenes)))
 
         final_path = project_dir / (project.get("output", "final_output.mp4"))
         self.assemble_clips(rendered_clips, final_path)
@@ -116,43 +143,30 @@ class CinematicEngine:
         scene_dir = project_dir / f"{index:02d}_{scene_id}"
         scene_dir.mkdir(parents=True, exist_ok=True)
 
-        # 1) Generate frames (placeholder - replace with your real renderer)
-        logger.debug("Generating frames for scene %s", scene_id)
-        frames_dir = scene_dir / "frames"
-        frames_dir.mkdir(parents=True, exist_ok=True)
-        # Hook: replace this with actual frame generation
-        num_frames = int(scene.get("duration", 3.0) * scene.get("fps", 25))
-        self._placeholder_generate_frames(frames_dir, num_frames)
-
-        # 2) Convert frames -> temp video clip using moviepy or ffmpeg (here use moviepy ImageSequenceClip)
-        from moviepy.editor import ImageSequenceClip
-        frame_files = sorted([str(p) for p in frames_dir.glob("*.png")])
-        if not frame_files:
-            raise CinematicEngineError(f"No frames generated for scene {scene_id}")
+        # 0) Kick off audio (TTS / voice) - independent of the frames, so it overlaps steps 1-2
+        audio_future = None
+        if scene.get("voice") or scene.get("tts", True):
+            logger.debug("Generating audio for scene %s", scene_id)
+            audio_future = _AUDIO_POOL.submit(self.generate_scene_audio, scene, scene_dir)
 
+        # 1+2) Generate frames and stream them straight into the encoder (placeholder -
+        # replace with your real renderer; anything yielding PIL images / HxWx3 arrays works)
+        logger.debug("Generating frames for scene %s", scene_id)
         fps = scene.get("fps", 25)
-        clip = ImageSequenceClip(frame_files, fps=fps)
+        num_frames = int(scene.get("duration", 3.0) * fps)
         tmp_clip_path = scene_dir / f"{scene_id}_video.mp4"
-        clip.write_videofile(str(tmp_clip_path), codec="libx264", fps=fps, audio=False, verbose=False, logger=None)
-        clip.close()
+        if not self._encode_frames(self._placeholder_frames(num_frames), tmp_clip_path, fps):
+            raise CinematicEngineError(f"No frames generated for scene {scene_id}")
 
-        # 3) Generate or attach audio (TTS / voice) - placeholder hook
-        audio_file = None
-        if scene.get("voice") or scene.get("tts", True):
-            logger.debug("Generating audio for scene %s", scene_id)
-            audio_file = self.generate_scene_audio(scene, scene_dir)
+        # 3) Collect the audio started in step 0
+        audio_file = audio_future.result() if audio_future else None
 
-        # 4) If audio exists, merge into final clip
+        # 4) If audio exists, mux it in; the video stream is copied, not re-encoded
         final_scene_clip = scene_dir / f"{scene_id}_final.mp4"
         if audio_file and Path(audio_file).exists():
-            video_clip = VideoFileClip(str(tmp_clip_path))
-            audio_clip = AudioFileClip(str(audio_file))
-            # If audio shorter/longer, we can set duration / loop etc.
-            audio_clip = audio_clip.set_duration(video_clip.duration)
-            video_clip = video_clip.set_audio(audio_clip)
-            video_clip.write_videofile(str(final_scene_clip), codec="libx264", audio_codec="aac", verbose=False, logger=None)
-            video_clip.close()
-            audio_clip.close()
+            self._mux_audio(tmp_clip_path, audio_file, final_scene_clip, num_frames / fps)
+            tmp_clip_path.unlink(missing_ok=True)
+            self._clips_with_audio.add(str(final_scene_clip))
         else:
             # No audio - rename temp clip to final scene clip
             shutil.move(str(tmp_clip_path), str(final_scene_clip))
@@ -165,46 +179,154 @@ class CinematicEngine:
         Concatenate scene clips into final MP4
         """
         logger.info("Assembling %d clips into %s", len(clip_paths), out_path)
+        # Every scene comes out of the same encoder settings, so the clips can be
+        # joined with the concat demuxer as a stream copy: one ffmpeg process, no
+        # decode/re-encode of the whole movie. Fall back to moviepy when the
+        # streams don't line up (some scenes have audio and others don't, or the
+        # fps / size / codec parameters differ): -c copy would still exit 0 there
+        # but write a broken file.
+        with_audio = sum(1 for p in clip_paths if str(p) in self._clips_with_audio)
+        if (with_audio in (0, len(clip_paths)) and self._streams_match(clip_paths)
+                and self._concat_copy(clip_paths, out_path)):
+            logger.info("Assembled final video (stream copy): %s", out_path)
+        else:
+            self._concat_reencode(clip_paths, out_path)
+
+        if cleanup:
+            # optional: remove intermediate scene folders
+            for p in clip_paths:
+                try:
+                    os.remove(p)
+                except Exception:
+                    pass
+
+    def _encode_frames(self, frames, out_path: Path, fps: float) -> int:
+        """
+        Pipe frames as raw RGB into one ffmpeg process - no per-frame PNG written to
+        disk and read back. ffmpeg starts on the first frame, once the size is known.
+        Returns the number of frames encoded.
+        """
+        proc = None
+        count = 0
+        try:
+            for frame in frames:
+                im = frame if isinstance(frame, Image.Image) else Image.fromarray(np.asarray(frame, dtype=np.uint8))
+                if im.mode != "RGB":
+                    im = im.convert("RGB")
+                if proc is None:
+                    size = im.size
+                    cmd = [FFMPEG_BIN, "-y", "-loglevel", "error",
+                           "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{size[0]}x{size[1]}", "-r", str(fps),
+                           "-i", "-", *h264_args(), "-pix_fmt", "yuv420p", str(out_path)]
+                    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                if im.size != size:
+                    im = im.resize(size)
+                proc.stdin.write(im.tobytes())
+                count += 1
+        except BrokenPipeError:
+            pass  # ffmpeg died; its stderr is reported below
+        finally:
+            if proc is not None:
+                try:
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+                err = proc.stderr.read()
+                if proc.wait() != 0:
+                    raise CinematicEngineError(f"ffmpeg frame encode failed: {err.decode(errors='replace')[-500:]}")
+        return count
+
+    def _mux_audio(self, video_path: Path, audio_path: str, out_path: Path, duration: float):
+        # audio is padded with silence / cut to the video length, as set_duration() did
+        cmd = [FFMPEG_BIN, "-y", "-loglevel", "error", "-i", str(video_path), "-i", str(audio_path),
+               "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", "-c:a", "aac", "-af", "apad",
+               "-t", f"{duration:.3f}", str(out_path)]
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            raise CinematicEngineError(f"ffmpeg audio mux failed: {proc.stderr.decode(errors='replace')[-500:]}")
+
+    def _stream_signature(self, path: str):
+        cmd = [FFPROBE_BIN, "-v", "error", "-show_entries",
+               "stream=" + ",".join(_CONCAT_STREAM_KEYS), "-of", "json", str(path)]
+        try:
+            proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            return None
+        if proc.returncode != 0:
+            return None
+        streams = json.loads(proc.stdout or b"{}").get("streams", [])
+        return [tuple(st.get(k) for k in _CONCAT_STREAM_KEYS) for st in streams]
+
+    def _streams_match(self, clip_paths: List[str]) -> bool:
+        first = None
+        for p in clip_paths:
+            sig = self._stream_signature(p)
+            if not sig:
+                logger.warning("Could not probe %s; re-encoding instead of stream copy", p)
+                return False
+            if first is None:
+                first = sig
+            elif sig != first:
+                logger.info("Scene clips differ in stream parameters; re-encoding instead of stream copy")
+                return False
+        return True
+
+    def _concat_copy(self, clip_paths: List[str], out_path: Path) -> bool:
+        list_file = Path(out_path).with_suffix(".concat.txt")
+        # one write for the whole manifest; paths are absolute so -safe 0 is needed
+        list_file.write_text("".join(
+            "file '{}'\n".format(str(Path(p).absolute()).replace("'", "'\\''")) for p in clip_paths
+        ))
+        cmd = [FFMPEG_BIN, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+               "-i", str(list_file), "-c", "copy", "-movflags", "+faststart", str(out_path)]
+        try:
+            proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            logger.warning("ffmpeg not found; falling back to moviepy concatenation")
+            return False
+        finally:
+            list_file.unlink(missing_ok=True)
+        if proc.returncode != 0:
+            logger.warning("Stream-copy concat failed, re-encoding instead: %s", proc.stderr.decode(errors="replace")[-500:])
+            return False
+        return True
+
+    def _concat_reencode(self, clip_paths: List[str], out_path: Path):
         clips = []
         for p in clip_paths:
             clips.append(VideoFileClip(str(p)))
         final = concatenate_videoclips(clips, method="compose")
         # Optionally set bitrate / codec here
-        final.write_videofile(str(out_path), codec="libx264", audio_codec="aac", threads=4, verbose=False, logger=None)
+        # threads=0 lets libx264 use every core (ignored by hardware encoders); faststart puts the moov atom up front
+        # so players can start before the whole file has downloaded
+        final.write_videofile(str(out_path), codec=video_encoder(), preset=encoder_preset(), audio_codec="aac", threads=0,
+                              ffmpeg_params=[*h264_quality_args(), "-movflags", "+faststart"],
+                              verbose=False, logger=None)
         final.close()
         for c in clips:
             c.close()
         logger.info("Assembled final video: %s", out_path)
 
-        if cleanup:
-            # optional: remove intermediate scene folders
-            for p in clip_paths:
-                try:
-                    os.remove(p)
-                except Exception:
-                    pass
-
     # ---------------------------
     # Hooks / Placeholders below
     # Replace these with your actual renderers / TTS / avatar pipelines
     # ---------------------------
 
-    def _placeholder_generate_frames(self, out_dir: Path, n_frames: int):
+    def _placeholder_frames(self, n_frames: int):
         """
-        Temporary generator: creates simple colored PNG frames.
+        Temporary generator: yields simple colored frames.
         Replace this with calls to your 3D renderer / avatar generator / sd api wrappers.
         """
-        logger.debug("Placeholder: generating %d frames in %s", n_frames, out_dir)
+        logger.debug("Placeholder: generating %d frames", n_frames)
         for i in range(n_frames):
             im = Image.new("RGB", (720, 1280), color=(int(255 * (i / max(1, n_frames - 1))), 50, 100))
             # draw frame number (optional)
             try:
-                from PIL import ImageDraw, ImageFont
                 draw = ImageDraw.Draw(im)
                 draw.text((30, 30), f"Frame {i+1}/{n_frames}", fill=(255, 255, 255))
             except Exception:
                 pass
-            im.save(out_dir / f"frame_{i:04d}.png")
+            yield im
 
     def generate_scene_audio(self, scene: Dict, scene_dir: Path) -> Optional[str]:
         """
@@ -0,0 +1,26 @@
+# engine/commands.py
+"""
+Shell command runner shared by the ffmpeg / Wav2Lip steps (lipsync, final merge).
+"""
+import logging
+import subprocess
+import tempfile
+
+LOG = logging.getLogger("visora.commands")
+
+# bytes of stderr kept for the error when a command fails
+STDERR_TAIL = 8192
+
+
+def run_cmd(cmd, log=LOG):
+    """Run a shell command; raise RuntimeError carrying the tail of its stderr if it fails."""
+    log.debug("Run cmd: %s", cmd)
+    # stderr (ffmpeg / inference progress spam on long runs) spools to an unnamed temp
+    # file instead of Python memory; only its tail is read, and only on failure
+    with tempfile.TemporaryFile() as errf:
+        proc = subprocess.run(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=errf)
+        if proc.returncode != 0:
+            errf.seek(max(0, errf.tell() - STDERR_TAIL))
+            err = errf.read().decode(errors="replace")
+            log.error("Command failed: %s\nstderr: %s", cmd, err)
+            raise RuntimeError(err)
@@ -4,6 +4,8 @@ import uuid
 import json
 import math
 import tempfile
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from moviepy.editor import (
     VideoFileClip, AudioFileClip, CompositeVideoClip,
     concatenate_videoclips, vfx, ImageClip
@@ -17,6 +19,11 @@ from engine.multiscene10.scenes_utils import build_subtitle_clip, finalize_and_e
 BASE_STATIC = "static/videos"
 os.makedirs(BASE_STATIC, exist_ok=True)
 
+# avatar generation per line is TTS (HTTP) + ffmpeg/wav2lip subprocesses, so threads overlap well
+LINE_WORKERS = int(os.environ.get("CONVERSATION_LINE_WORKERS", 8))
+
+logger = logging.getLogger("conversation_engine")
+
 def _parse_conversation(script_text, avatars):
     """
     Accepts either:
@@ -52,11 +59,11 @@ def _parse_conversation(script_text, avatars):
         turns.append({"speaker": sp, "text": p["text"], "avatar_conf": conf})
     return turns
 
-def _render_line_to_clip(turn, global_opts):
+def _render_line_avatar(turn, global_opts):
     """
     turn: {"speaker","text","avatar_conf"}
     global_opts: things like mode, default duration, bg, outfit, emotion etc.
-    Returns a moviepy VideoFileClip for that line (path or clip).
+    Returns path to the talking-avatar mp4 for that line.
     """
     conf = turn.get("avatar_conf", {}) or {}
     # combine global and per-avatar config (per-avatar overrides)
@@ -66,9 +73,9 @@ def _render_line_to_clip(turn, global_opts):
     outfit = conf.get("outfit") or global_opts.get("outfit", None)
     face = conf.get("face") or global_opts.get("face", None)
 
-    # generate avatar video clip for this single line
+    # generate avatar video for this single line
     # generate_talking_avatar returns a filepath to mp4 (existing function)
-    avatar_video_path = generate_talking_avatar(
+    return generate_talking_avatar(
         turn["text"],
         gender=gender,
         emotion=emotion,
@@ -78,6 +85,10 @@ def _render_line_to_clip(turn, global_opts):
         apply_template=False
     )
 
+def _render_line_to_clip(turn, avatar_video_path, global_opts):
+    """
+    Returns a moviepy VideoFileClip for that line, trimmed/padded and subtitled.
+    """
     clip = VideoFileClip(avatar_video_path)
     # trim or pad to fit desired seconds (optional)
     desired_dur = global_opts.get("per_line_duration", None)
@@ -174,10 +185,19 @@ def generate_multi_avatar_conversation(script_text, avatars, global_opts=None, o
     """
     global_opts = global_opts or {}
     turns = _parse_conversation(script_text, avatars)
+    # lines are independent until composition: render the avatars concurrently,
+    # then build the moviepy clips in turn order on this thread
+    with ThreadPoolExecutor(max_workers=max(1, min(LINE_WORKERS, len(turns)))) as pool:
+        futures = [pool.submit(_render_line_avatar, turn, global_opts) for turn in turns]
     clips = []
-    for turn in turns:
-        clip = _render_line_to_clip(turn, global_opts)
-        clips.append(clip)
+    for idx, (turn, fut) in enumerate(zip(turns, futures)):
+        if fut.exception() is not None:
+            # one bad line should not sink the whole conversation
+            logger.warning("conversation line %d (%s) failed: %s", idx, turn["speaker"], fut.exception())
+            continue
+        clips.append(_render_line_to_clip(turn, fut.result(), global_opts))
+    if not clips:
+        raise RuntimeError("no conversation line could be rendered")
 
     # music generation (if requested)
     music_path = None
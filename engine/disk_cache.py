@@ -0,0 +1,30 @@
+# engine/disk_cache.py
+"""
+Size cap for the on-disk caches (SD backgrounds, TTS audio): files are kept by
+request hash and evicted least-recently-used first, using mtime as the recency
+stamp (callers touch an entry with os.utime on every hit).
+"""
+import os
+
+
+def evict_lru(directory, suffix, max_files):
+    """
+    Delete the oldest-mtime files ending in `suffix` beyond `max_files`.
+    max_files <= 0 means no limit. Call it after a miss added an entry; a hit
+    cannot grow the cache.
+    """
+    if max_files <= 0:
+        return
+    try:
+        with os.scandir(directory) as it:
+            entries = [(e.stat().st_mtime, e.path) for e in it if e.name.endswith(suffix)]
+    except FileNotFoundError:
+        return
+    if len(entries) <= max_files:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - max_files]:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,39 @@
+# engine/downloads.py
+"""
+Fetches model outputs (Replicate delivery URLs and the like) to local files.
+
+One keep-alive session per process, shared by every engine: back-to-back
+downloads from the same CDN reuse pooled TLS connections instead of spawning a
+wget and handshaking per file.
+"""
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", 300))
+DOWNLOAD_CHUNK = 1024 * 1024
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32,
+                       max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504)))
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+
+def download_file(url, dest):
+    """Stream url to dest (via a .part file, so dest is never left half-written); returns dest."""
+    url = str(url)  # replicate FileOutput objects stringify to their URL
+    tmp = f"{dest}.part"
+    try:
+        with _session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as r:
+            r.raise_for_status()
+            with open(tmp, "wb") as f:
+                for chunk in r.iter_content(DOWNLOAD_CHUNK):
+                    f.write(chunk)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return dest
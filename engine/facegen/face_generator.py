@@ -1,6 +1,6 @@
 import replicate
 import uuid
-import os
+from engine.downloads import download_file
 from base64 import b64decode
 
 def generate_face(gender="any"):
@@ -24,6 +24,6 @@ def generate_face(gender="any"):
     # Download image to backend
     img_id = str(uuid.uuid4())[:8]
     save_path = f"engine/avatars/auto_{img_id}.png"
-    os.system(f"wget {image_url} -O {save_path}")
+    download_file(image_url, save_path)
 
     return save_path
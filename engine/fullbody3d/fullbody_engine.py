@@ -1,6 +1,6 @@
 import replicate
 import uuid
-import os
+from engine.downloads import download_file
 import json
 import subprocess
 
@@ -24,7 +24,7 @@ def generate_fullbody_avatar(face_image, style="fortnite"):
 
     model_url = output["model"]
     model_path = f"static/3d/fullbody_{uuid.uuid4().hex[:8]}.fbx"
-    os.system(f"wget {model_url} -O {model_path}")
+    download_file(model_url, model_path)
 
     return model_path
 
@@ -1,8 +1,91 @@
 from gtts import gTTS
+import os
+import re
 import uuid
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from engine.disk_cache import evict_lru
+
+# gTTS output is deterministic for (lang, text); keep one copy per pair on disk.
+# Least-recently-used entries (by mtime, touched on every hit) are evicted past
+# TTS_CACHE_MAX files (0 for no limit), as engine/sd_api.py does for backgrounds.
+TTS_CACHE_DIR = Path(os.environ.get("TTS_CACHE_DIR", "static/videos/_tts_cache"))
+TTS_CACHE_MAX = int(os.environ.get("TTS_CACHE_MAX", 5000))
+# concurrent gTTS requests per script (network-bound)
+TTS_WORKERS = int(os.environ.get("TTS_WORKERS", 8))
+_SENTENCE_RE = re.compile(r"(?<=[.?!])\s+")
+
+
+def _cached_tts(text, lang_code):
+    key = hashlib.sha256(f"{lang_code}\0{text}".encode("utf-8")).hexdigest()
+    cached = TTS_CACHE_DIR / f"{key}.mp3"
+    try:
+        os.utime(cached)  # hit: mark as recently used
+    except FileNotFoundError:
+        TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_name(f"{cached.name}.{os.getpid()}.{uuid.uuid4().hex[:6]}.part")
+        try:
+            gTTS(text=text, lang=lang_code).save(str(tmp))
+            os.replace(tmp, cached)
+        finally:
+            tmp.unlink(missing_ok=True)
+        # only a miss grows the cache
+        evict_lru(TTS_CACHE_DIR, ".mp3", TTS_CACHE_MAX)
+    return cached
+
+
+def _tts_to(text, lang_code, dest):
+    """
+    Put the speech for text at dest as a hard link to (or copy of) the cache entry.
+    Callers own dest; a link pins the inode, so a later eviction can't touch it.
+    """
+    while True:
+        cached = _cached_tts(text, lang_code)
+        try:
+            try:
+                os.link(cached, dest)
+            except FileNotFoundError:
+                raise
+            except OSError:
+                # dest exists, or the cache is on another filesystem
+                shutil.copyfile(cached, dest)
+            return dest
+        except FileNotFoundError:
+            if cached.exists():
+                raise  # dest's directory is missing, not the cache entry
+            # another worker evicted it between lookup and link; fetch it again
+
 
 def generate_tts(text, lang_code="en"):
     file = f"static/videos/tts_{uuid.uuid4().hex[:6]}.mp3"
-    tts = gTTS(text=text, lang=lang_code)
-    tts.save(file)
+    return _tts_to(text, lang_code, file)
+
+
+def generate_tts_sentences(text, lang_code="en", out_path=None):
+    """
+    Like generate_tts, but one gTTS request per sentence, fetched concurrently and
+    cached per sentence, so wall time is the slowest sentence rather than the sum
+    and an edited script only re-fetches the sentences that changed.
+    """
+    sentences = [s for s in _SENTENCE_RE.split(text.strip()) if s]
+    file = out_path or f"static/videos/tts_{uuid.uuid4().hex[:6]}.mp3"
+    if len(sentences) < 2:
+        return _tts_to(text, lang_code, file)
+    TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # each part is linked out of the cache as soon as it exists, so an eviction by
+    # another worker before the concatenation below can't pull it from under us
+    with tempfile.TemporaryDirectory(dir=TTS_CACHE_DIR) as parts_dir:
+        with ThreadPoolExecutor(max_workers=min(TTS_WORKERS, len(sentences))) as pool:
+            parts = list(pool.map(
+                lambda i_s: _tts_to(i_s[1], lang_code, os.path.join(parts_dir, f"{i_s[0]:04d}.part")),
+                enumerate(sentences),
+            ))
+        # gTTS returns bare MPEG audio frames, so the parts join by plain concatenation
+        with open(file, "wb") as out:
+            for part in parts:
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out)
     return file
@@ -1,6 +1,6 @@
 import replicate
 import uuid
-import os
+from engine.downloads import download_file
 from moviepy.editor import VideoFileClip, vfx, CompositeVideoClip, ImageClip
 
 def apply_ai_relight(input_face):
@@ -19,7 +19,7 @@ def apply_ai_relight(input_face):
     out_url = output["output"][0]
     save_name = f"engine/lighting/relighted_{uuid.uuid4().hex[:8]}.png"
     
-    os.system(f"wget {out_url} -O {save_name}")
+    download_file(out_url, save_name)
 
     return save_name
 
@@ -9,9 +9,10 @@ Wav2Lip wrapper:
 import os
 import logging
 import uuid
-import subprocess
 from pathlib import Path
 
+from engine.commands import run_cmd
+
 LOG = logging.getLogger("visora.lipsync")
 LOG.setLevel(logging.INFO)
 
@@ -23,14 +24,6 @@ def ensure_model_exists():
     if not WAV2LIP_PTH.exists():
         raise FileNotFoundError(f"Wav2Lip model not found at {WAV2LIP_PTH}. Place wav2lip_gan.pth there.")
 
-def _run_cmd(cmd):
-    LOG.debug("Run cmd: %s", cmd)
-    proc = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    if proc.returncode != 0:
-        LOG.error("Cmd failed: %s\nstderr:%s", cmd, proc.stderr.decode())
-        raise RuntimeError(proc.stderr.decode())
-    return proc.stdout
-
 def lipsync_with_wav2lip(wav_path: str, face_video: str=None) -> str:
     """
     Run Wav2Lip inference.
@@ -51,6 +44,6 @@ def lipsync_with_wav2lip(wav_path: str, face_video: str=None) -> str:
         f"python wav2lip/inference.py --checkpoint_path {WAV2LIP_PTH} "
         f"--face {face_video} --audio {wav_path} --outfile {out_file}"
     )
-    _run_cmd(cmd)
+    run_cmd(cmd, LOG)
     LOG.info("Lipsync done: %s", out_file)
     return str(out_file)
@@ -5,25 +5,20 @@ Final processing:
 - Optionally upload to S3 / Cloudinary (placeholder)
 """
 
+import shlex
 import logging
-import subprocess
 from pathlib import Path
 import uuid
 
+from engine.video_encoder import FFMPEG_BIN, h264_args
+from engine.commands import run_cmd
+
 LOG = logging.getLogger("visora.merge")
 LOG.setLevel(logging.INFO)
 
 OUT_DIR = Path("static/videos")
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-def _run_cmd(cmd):
-    LOG.debug("Run cmd: %s", cmd)
-    p = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    if p.returncode != 0:
-        LOG.error("Command failed: %s\nstderr: %s", cmd, p.stderr.decode())
-        raise RuntimeError(p.stderr.decode())
-    return p.stdout
-
 def merge_final(lip_video_path: str) -> str:
     """
     Re-encode lip video to consistent format & create thumbnail.
@@ -35,15 +30,16 @@ def merge_final(lip_video_path: str) -> str:
     out_file = OUT_DIR / f"{uuid.uuid4()}.mp4"
     # Re-encode to H264 baseline, AAC audio, 720p (adjust as needed)
     cmd = (
-        f"ffmpeg -y -i {lip} -c:v libx264 -preset fast -crf 23 -c:a aac -b:a 128k "
+        # the binary the encoder was probed with
+        f"{shlex.quote(FFMPEG_BIN)} -y -i {lip} {' '.join(h264_args())} -c:a aac -b:a 128k "
         f"-movflags +faststart -vf scale='min(1280,iw)':'-2' {out_file}"
     )
-    _run_cmd(cmd)
+    run_cmd(cmd, LOG)
     LOG.info("Re-encoded final: %s", out_file)
 
     # thumbnail (first frame)
     thumb = str(out_file.with_suffix('.jpg'))
-    _run_cmd(f"ffmpeg -y -i {out_file} -ss 00:00:00 -vframes 1 {thumb}")
+    run_cmd(f"{shlex.quote(FFMPEG_BIN)} -y -i {out_file} -ss 00:00:00 -vframes 1 {thumb}", LOG)
     LOG.info("Thumbnail: %s", thumb)
 
     # Optionally: upload_to_s3(out_file) -> placeholder function
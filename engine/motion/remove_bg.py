@@ -1,6 +1,6 @@
 import replicate
 import uuid
-import os
+from engine.downloads import download_file
 
 def remove_bg(video_path):
     output = replicate.run(
@@ -11,5 +11,5 @@ def remove_bg(video_path):
     out_url = output["output"]
     masked = f"static/videos/fg_{uuid.uuid4().hex[:8]}.mp4"
 
-    os.system(f"wget {out_url} -O {masked}")
+    download_file(out_url, masked)
     return masked
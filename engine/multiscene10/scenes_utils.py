@@ -1,5 +1,5 @@
 # engine/multiscene10/scenes_utils.py
-import math, os, uuid, json
+import math, os, re, uuid, json
 from moviepy.editor import VideoFileClip, concatenate_videoclips, CompositeVideoClip, TextClip, AudioFileClip, vfx
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -7,6 +7,8 @@ PRESETS_PATH = os.path.join(BASE_DIR, "presets.json")
 with open(PRESETS_PATH, "r") as f:
     PRESETS = json.load(f)
 
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
 def smart_split_script(script_text, max_scenes=3):
     """
     Splits script by sentences into up to max_scenes parts.
@@ -16,8 +18,7 @@ def smart_split_script(script_text, max_scenes=3):
         parts = [p.strip() for p in script_text.split("[--scene--]") if p.strip()]
         return parts[:max_scenes]
     # naive split by sentences
-    import re
-    sentences = re.split(r'(?<=[.!?])\s+', script_text.strip())
+    sentences = _SENTENCE_RE.split(script_text.strip())
     if len(sentences) <= max_scenes:
         return [" ".join(sentences)]
     # distribute sentences to scenes
@@ -43,7 +44,9 @@ def finalize_and_export(final_clip, out_path, fps=24):
     """
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
     # ensure audio codec aac for compatibility
-    final_clip.write_videofile(out_path, fps=fps, codec="libx264", audio_codec="aac")
+    # threads=0: libx264 on all cores; faststart: moov atom first for instant playback
+    final_clip.write_videofile(out_path, fps=fps, codec="libx264", audio_codec="aac", threads=0,
+                               ffmpeg_params=["-movflags", "+faststart"])
     return out_path
 
 def apply_transition(clip_a, clip_b, transition_type="crossfade", duration=0.6):
@@ -1,6 +1,6 @@
 import replicate
 import uuid
-import os
+from engine.downloads import download_file
 
 def apply_outfit_change(face_image, outfit="suit"):
     """
@@ -30,6 +30,6 @@ def apply_outfit_change(face_image, outfit="suit"):
 
     out_url = output["image"]
     save_name = f"static/uploads/outfit_{uuid.uuid4().hex[:8]}.png"
-    os.system(f"wget {out_url} -O {save_name}")
+    download_file(out_url, save_name)
 
     return save_name
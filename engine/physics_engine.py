@@ -44,6 +44,11 @@ if not log.handlers:
     log.addHandler(ch)
 
 
+# transient frames are read back once by ffmpeg; zlib level 1 writes ~3x faster than
+# Pillow's default of 6 for a slightly larger file
+FRAME_PNG_COMPRESS = int(os.getenv("FRAME_PNG_COMPRESS", 1))
+
+
 class PhysicsEngineError(Exception):
     pass
 
@@ -284,7 +289,7 @@ class PhysicsEngine:
                 except Exception:
                     # if overlay shorter, just keep base
                     pass
-                base_img.save(out_frames / f"frame_{i:04d}.png")
+                base_img.save(out_frames / f"frame_{i:04d}.png", compress_level=FRAME_PNG_COMPRESS)
             # produce mp4
             out_mp4 = out / "composite.mp4"
             files = sorted([str(p) for p in out_frames.glob("*.png")])
@@ -306,8 +311,9 @@ class PhysicsEngine:
         import random, math
         density = max(0.05, min(1.0, intensity)) * 0.02 * (w*h/1000000.0) * 100  # heuristic
         drops = int(100 * density)
+        blank = Image.new("RGBA", (w, h), (0, 0, 0, 0))
         for i in range(n):
-            img = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+            img = blank.copy()
             draw = ImageDraw.Draw(img)
             for d in range(drops):
                 x = random.randint(0, w-1)
@@ -317,14 +323,15 @@ class PhysicsEngine:
                 draw.line((x, y, x, y+length), fill=(200,200,255, alpha), width=1)
             # slight blur for motion
             img = img.filter(ImageFilter.GaussianBlur(radius=0.8))
-            img.save(out_dir / f"rain_{i:04d}.png")
+            img.save(out_dir / f"rain_{i:04d}.png", compress_level=FRAME_PNG_COMPRESS)
 
     def _create_dust_frames(self, out_dir: Path, n: int, w: int, h: int, intensity: float):
         out_dir.mkdir(parents=True, exist_ok=True)
         import random
         particles = int(40 + 200 * float(intensity))
+        blank = Image.new("RGBA", (w, h), (0, 0, 0, 0))
         for i in range(n):
-            base = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+            base = blank.copy()
             draw = ImageDraw.Draw(base)
             for p in range(particles):
                 x = int(random.random() * w)
@@ -334,7 +341,7 @@ class PhysicsEngine:
                 color = (200, 180, 150, alpha)
                 draw.ellipse((x, y, x+size, y+size), fill=color)
             base = base.filter(ImageFilter.GaussianBlur(radius=1.0*intensity))
-            base.save(out_dir / f"dust_{i:04d}.png")
+            base.save(out_dir / f"dust_{i:04d}.png", compress_level=FRAME_PNG_COMPRESS)
 
     # -------------------------
     # Utility: clear workdir
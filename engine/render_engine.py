@@ -9,6 +9,7 @@ High-level render orchestrator.
 """
 
 import logging
+import wave
 from pathlib import Path
 import uuid
 
@@ -19,6 +20,14 @@ from engine.merge_engine import merge_final
 LOG = logging.getLogger("visora.render")
 LOG.setLevel(logging.INFO)
 
+def _wav_duration(wav_path: str):
+    """Duration from the WAV header; no ffprobe process needed."""
+    try:
+        with wave.open(str(wav_path), "rb") as w:
+            return w.getnframes() / float(w.getframerate())
+    except (OSError, EOFError, wave.Error):
+        return None
+
 def render_from_script(script_text: str, face_video: str=None) -> dict:
     """
     Orchestrates full pipeline. Returns dict with final path and metadata.
@@ -39,8 +48,8 @@ def render_from_script(script_text: str, face_video: str=None) -> dict:
     # metadata
     meta = {
         "final_path": final,
-        "duration_seconds": None,   # optionally fill using ffprobe
+        "duration_seconds": _wav_duration(wav_path),  # the lipsynced video follows the audio
         "script_text": script_text[:2000],
-        "id": str(uuid.uuid4())
+        "id": uuid.uuid4().hex
     }
     return meta
@@ -1,22 +1,62 @@
 import os
+import json
+import hashlib
+import threading
+from concurrent.futures import Future
+import redis
 import requests
+from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from PIL import Image
-from io import BytesIO
+from engine.disk_cache import evict_lru
 import time
 import uuid
 
 # Replace with your API URL + TOKEN (Replicate/Stability/etc)
 SD_API_URL = os.getenv("SD_API_URL", "")
 SD_API_TOKEN = os.getenv("SD_API_TOKEN", "")
+# built once; only sent to SD_API_URL, never on the image download
+SD_HEADERS = {
+    "Authorization": f"Token {SD_API_TOKEN}",
+    "Content-Type": "application/json"
+}
+# Public URL of POST /sd/webhook (api/sd_routes.py). When set, the API calls us
+# back on completion and we block on Redis instead of polling the prediction.
+SD_WEBHOOK_URL = os.getenv("SD_WEBHOOK_URL", "")
+# shared with api/sd_routes.py, which rejects callbacks without it (unless it verifies
+# Replicate's signature via SD_WEBHOOK_SECRET instead)
+SD_WEBHOOK_TOKEN = os.getenv("SD_WEBHOOK_TOKEN", "")
+SD_WEBHOOK_WAIT = int(os.getenv("SD_WEBHOOK_WAIT", 60))
+SD_POLL_INTERVAL = float(os.getenv("SD_POLL_INTERVAL", 2))
+SD_POLL_TIMEOUT = float(os.getenv("SD_POLL_TIMEOUT", 60))
+REDIS_URL = os.getenv("REDIS_URL") or os.getenv("CELERY_BROKER_URL") or "redis://localhost:6379/0"
+# Finished backgrounds are kept on disk by request hash so a repeat prompt skips
+# the API entirely. Least-recently-used files (by mtime, touched on every hit)
+# are evicted past SD_CACHE_MAX; 0 disables the cache.
+SD_CACHE_DIR = os.getenv("SD_CACHE_DIR", "engine/backgrounds/cache")
+SD_CACHE_MAX = int(os.getenv("SD_CACHE_MAX", 500))
+
+# One keep-alive session per process: the create POST, every poll and the image
+# download reuse pooled TLS connections instead of handshaking per call.
+_sd_session = requests.Session()
+_sd_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32,
+                          max_retries=Retry(total=2, backoff_factor=0.3))
+_sd_session.mount("https://", _sd_adapter)
+_sd_session.mount("http://", _sd_adapter)
+
+# one client per process; its pool hands each waiting blpop its own connection
+_redis = redis.Redis.from_url(REDIS_URL)
+
+# request key -> Future of the output path, for predictions running right now
+_inflight = {}
+_inflight_lock = threading.Lock()
 
 def generate_ai_background(prompt):
     if SD_API_URL == "" or SD_API_TOKEN == "":
         raise Exception("Stable Diffusion API URL or TOKEN missing!")
 
-    headers = {
-        "Authorization": f"Token {SD_API_TOKEN}",
-        "Content-Type": "application/json"
-    }
+    headers = SD_HEADERS
 
     payload = {
         "prompt": prompt,
@@ -25,8 +65,56 @@ def generate_ai_background(prompt):
         "num_inference_steps": 30
     }
 
+    # identical requests already in flight in this process share one prediction
+    key = _request_key(payload)
+    cached = _cache_get(key)
+    if cached:
+        return cached
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        if pending is None:
+            _inflight[key] = fut = Future()
+    if pending is not None:
+        return pending.result()
+    try:
+        out_path = _run_prediction(payload, headers, _cache_path(key) if SD_CACHE_MAX > 0 else None)
+        evict_lru(SD_CACHE_DIR, ".png", SD_CACHE_MAX)
+        fut.set_result(out_path)
+        return out_path
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _request_key(payload):
+    canon = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canon.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(SD_CACHE_DIR, f"{key}.png")
+
+
+def _cache_get(key):
+    if SD_CACHE_MAX <= 0:
+        return None
+    path = _cache_path(key)
+    try:
+        os.utime(path)  # mark as recently used
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def _run_prediction(payload, headers, out_path=None):
+    if SD_WEBHOOK_URL:
+        payload = {**payload, "webhook": _webhook_url(), "webhook_events_filter": ["completed"]}
+
     # POST request — create SD job
-    response = requests.post(SD_API_URL, json=payload, headers=headers)
+    response = _sd_session.post(SD_API_URL, json=payload, headers=headers, timeout=(5, 60))
     response.raise_for_status()
     result = response.json()
 
@@ -35,24 +123,76 @@ def generate_ai_background(prompt):
     if not prediction_id:
         raise Exception("Invalid response: no prediction id")
 
-    # Polling for result
-    for _ in range(30):
-        poll = requests.get(f"{SD_API_URL}/{prediction_id}", headers=headers)
+    output = _wait_webhook(prediction_id) if SD_WEBHOOK_URL else None
+    if not output:
+        # no webhook configured, or it never arrived: fall back to polling
+        output = _poll_output(prediction_id, headers)
+    return _save_output(output, out_path)
+
+
+def _webhook_url():
+    if not SD_WEBHOOK_TOKEN:
+        return SD_WEBHOOK_URL
+    sep = "&" if "?" in SD_WEBHOOK_URL else "?"
+    return f"{SD_WEBHOOK_URL}{sep}{urlencode({'token': SD_WEBHOOK_TOKEN})}"
+
+
+def _wait_webhook(prediction_id):
+    try:
+        item = _redis.blpop(f"sd:done:{prediction_id}", timeout=SD_WEBHOOK_WAIT)
+    except redis.RedisError:
+        return None
+    if not item:
+        return None
+    return json.loads(item[1]).get("output")
+
+
+def _poll_output(prediction_id, headers):
+    # Polling for result: start fast (most predictions finish early) and back
+    # off to SD_POLL_INTERVAL, giving up after SD_POLL_TIMEOUT seconds overall
+    deadline = time.monotonic() + SD_POLL_TIMEOUT
+    attempt = 0
+    while True:
+        poll = _sd_session.get(f"{SD_API_URL}/{prediction_id}", headers=headers, timeout=(5, 30))
         pdata = poll.json()
 
         # Check for image output (Replicate usually gives list of URLs)
         output = pdata.get("output", None)
         if output:
-            image_url = output[0]
-            img_bytes = requests.get(image_url).content
-            img = Image.open(BytesIO(img_bytes)).convert("RGB")
+            return output
 
-            filename = f"sd_bg_{uuid.uuid4().hex}.png"
-            out_path = os.path.join("engine/backgrounds", filename)
-            img.save(out_path)
+        delay = min(SD_POLL_INTERVAL, 0.2 * (1.5 ** attempt))
+        attempt += 1
+        if time.monotonic() + delay > deadline:
+            break
+        time.sleep(delay)
 
-            return out_path
+    raise Exception("Stable Diffusion generation timeout!")
 
-        time.sleep(2)
 
-    raise Exception("Stable Diffusion generation timeout!")
+def _save_output(output, out_path=None):
+    image_url = output[0] if isinstance(output, list) else output
+    if out_path is None:
+        filename = f"sd_bg_{uuid.uuid4().hex}.png"
+        out_path = os.path.join("engine/backgrounds", filename)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    # stream the download to disk rather than holding the encoded image in memory too;
+    # the PNG is swapped in with os.replace so other workers never read a partial file
+    tmp_path = f"{out_path}.{os.getpid()}.part"
+    png_tmp = f"{out_path}.{os.getpid()}.tmp"
+    try:
+        with _sd_session.get(image_url, stream=True, timeout=(5, 60)) as resp:
+            resp.raise_for_status()
+            with open(tmp_path, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+        with Image.open(tmp_path) as img:
+            img.convert("RGB").save(png_tmp, format="PNG")
+        os.replace(png_tmp, out_path)
+    finally:
+        for p in (tmp_path, png_tmp):
+            if os.path.exists(p):
+                os.unlink(p)
+
+    return out_path
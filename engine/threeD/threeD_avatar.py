@@ -1,6 +1,6 @@
 import replicate
 import uuid
-import os
+from engine.downloads import download_file
 
 def generate_3d_from_face(face_path):
     output = replicate.run(
@@ -10,7 +10,7 @@ def generate_3d_from_face(face_path):
 
     mesh_url = output["mesh"]
     mesh_save_path = f"static/3d/mesh_{uuid.uuid4().hex[:8]}.obj"
-    os.system(f"wget {mesh_url} -O {mesh_save_path}")
+    download_file(mesh_url, mesh_save_path)
 
     return mesh_save_path
 
@@ -32,7 +32,7 @@ def stylize_3d_texture(face_path, style="pixar"):
 
     tex_url = output["output"][0]
     tex_path = f"static/3d/tex_{uuid.uuid4().hex[:8]}.png"
-    os.system(f"wget {tex_url} -O {tex_path}")
+    download_file(tex_url, tex_path)
 
     return tex_path
 
@@ -49,6 +49,6 @@ def generate_3d_talking_avatar(mesh_path, texture_path, audio_path):
 
     video_url = output["video"]
     save_path = f"static/videos/3d_{uuid.uuid4().hex[:8]}.mp4"
-    os.system(f"wget {video_url} -O {save_path}")
+    download_file(video_url, save_path)
 
     return save_path
@@ -0,0 +1,87 @@
+# engine/video_encoder.py
+"""
+H.264 encoder selection shared by the ffmpeg / moviepy writers.
+
+VIDEO_ENCODER=auto (default) test-encodes one frame with h264_nvenc, then
+h264_qsv, the first time an encoder is needed in a process, and falls back to
+libx264. A listed encoder is not enough: most ffmpeg builds ship nvenc whether
+or not the host has a GPU. Set VIDEO_ENCODER=libx264|h264_nvenc|h264_qsv to
+skip the probe.
+
+The probe runs FFMPEG_BIN, the binary the engines encode with (moviepy's
+FFMPEG_BINARY, often the bundled imageio-ffmpeg build), with exactly the flags
+h264_args() would send, so an old build that rejects e.g. "-preset p4" falls
+through to the next encoder instead of failing every render.
+"""
+import os
+import logging
+import functools
+import subprocess
+
+LOG = logging.getLogger("visora.encoder")
+
+try:
+    # the ffmpeg moviepy itself runs (imageio-ffmpeg ships one when the system has none)
+    from moviepy.config import get_setting
+    FFMPEG_BIN = get_setting("FFMPEG_BINARY")
+except Exception:
+    FFMPEG_BIN = "ffmpeg"
+
+VIDEO_ENCODER = os.environ.get("VIDEO_ENCODER", "auto").strip().lower()
+# libx264 preset; moviepy/ffmpeg default to "medium", which buys nothing visible here
+X264_PRESET = os.environ.get("X264_PRESET", "veryfast")
+
+_PRESETS = {
+    "libx264": X264_PRESET,
+    "h264_nvenc": os.environ.get("NVENC_PRESET", "p4"),
+    "h264_qsv": os.environ.get("QSV_PRESET", "veryfast"),
+}
+# constant-quality flags, roughly equivalent to x264 crf 23
+_QUALITY = {
+    "libx264": ["-crf", "23"],
+    "h264_nvenc": ["-rc", "vbr", "-cq", "23"],
+    "h264_qsv": ["-global_quality", "23"],
+}
+
+
+def _encoder_args(name: str) -> list:
+    return ["-c:v", name, "-preset", _PRESETS.get(name, X264_PRESET)] + _QUALITY.get(name, [])
+
+
+def _encoder_works(name: str) -> bool:
+    cmd = [
+        FFMPEG_BIN, "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", "color=c=black:s=256x256:d=0.1",
+        "-frames:v", "1", *_encoder_args(name), "-pix_fmt", "yuv420p", "-f", "null", "-",
+    ]
+    try:
+        p = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=20)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return p.returncode == 0
+
+
+@functools.lru_cache(maxsize=None)
+def video_encoder() -> str:
+    """ffmpeg encoder name for H.264 output, probed once per process."""
+    if VIDEO_ENCODER != "auto":
+        return VIDEO_ENCODER
+    for name in ("h264_nvenc", "h264_qsv"):
+        if _encoder_works(name):
+            LOG.info("Using hardware H.264 encoder %s", name)
+            return name
+    return "libx264"
+
+
+def encoder_preset() -> str:
+    return _PRESETS.get(video_encoder(), X264_PRESET)
+
+
+def h264_quality_args() -> list:
+    """Constant-quality flags for the selected encoder (moviepy: pass as ffmpeg_params)."""
+    return list(_QUALITY.get(video_encoder(), []))
+
+
+def h264_args() -> list:
+    """-c:v / -preset / quality arguments for an ffmpeg command line run with FFMPEG_BIN."""
+    return _encoder_args(video_encoder())
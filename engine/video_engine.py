@@ -1,8 +1,8 @@
 import os
 import uuid
-from gtts import gTTS
 from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip, vfx
 from .sd_api import generate_ai_background
+from .language.tts_engine import generate_tts_sentences
 
 from .template_engine import pick_template_bg, apply_template_style, build_captions
 
@@ -18,9 +18,8 @@ def generate_cinematic_video(script_text, template="motivation"):
     video_output = f"{output_dir}/{video_id}.mp4"
     audio_output = f"{output_dir}/{video_id}.mp3"
 
-    # Voice
-    tts = gTTS(script_text)
-    tts.save(audio_output)
+    # Voice (per-sentence gTTS requests in parallel)
+    generate_tts_sentences(script_text, "en", audio_output)
     audio = AudioFileClip(audio_output)
 
     # Background based on template
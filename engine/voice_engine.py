@@ -18,6 +18,7 @@ Dependencies to have in requirements.txt:
 
 import os
 import uuid
+import wave
 import logging
 from pathlib import Path
 import json
@@ -28,6 +29,8 @@ log.setLevel(logging.INFO)
 
 # Try EleventLabs via REST (no SDK required)
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Try Coqui
 try:
@@ -36,6 +39,13 @@ try:
 except Exception:
     COQUI_AVAILABLE = False
 
+# Try Piper (local ONNX TTS, no network)
+try:
+    from piper import PiperVoice  # optional - piper-tts
+    PIPER_AVAILABLE = True
+except Exception:
+    PIPER_AVAILABLE = False
+
 # Try gTTS fallback
 try:
     from gtts import gTTS
@@ -46,7 +56,20 @@ except Exception:
 from pydub import AudioSegment
 
 ELEVEN_API_KEY = os.getenv("ELEVEN_API_KEY", "").strip()
+# TTS_ENGINE=piper tries the local Piper voice before any network TTS
+TTS_ENGINE = os.getenv("TTS_ENGINE", "").strip().lower()
+PIPER_MODEL = os.getenv("PIPER_MODEL", "").strip()  # path to e.g. en_US-amy-medium.onnx
 ELEVEN_BASE = "https://api.elevenlabs.io/v1"
+ELEVEN_HEADERS = {
+    "xi-api-key": ELEVEN_API_KEY,
+    "Content-Type": "application/json"
+}
+
+# One keep-alive session per process: TLS to ElevenLabs is reused across
+# characters and across jobs handled by the same worker.
+_tts_session = requests.Session()
+_tts_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                                           max_retries=Retry(total=2, backoff_factor=0.3)))
 
 # Voice preset mapping: (gender, age_group) -> dict of preferred backends (eleven voice id etc.)
 # Replace the "eleven_voice_id" values with actual voice IDs you create in ElevenLabs.
@@ -124,10 +147,6 @@ def eleven_synthesize_to_wav(text: str, voice_id: str, out_wav_path: str, stabil
 
     # endpoint: /text-to-speech/{voice_id}
     url = f"{ELEVEN_BASE}/text-to-speech/{voice_id}"
-    headers = {
-        "xi-api-key": ELEVEN_API_KEY,
-        "Content-Type": "application/json"
-    }
     payload = {
         "text": text,
         "voice_settings": {
@@ -136,14 +155,14 @@ def eleven_synthesize_to_wav(text: str, voice_id: str, out_wav_path: str, stabil
         }
     }
     # make request (ElevenLabs returns audio/wav)
-    resp = requests.post(url, headers=headers, json=payload, stream=True, timeout=60)
+    resp = _tts_session.post(url, headers=ELEVEN_HEADERS, json=payload, stream=True, timeout=(5, 60))
     if resp.status_code not in (200, 201):
         raise RuntimeError(f"ElevenLabs TTS failed: {resp.status_code} {resp.text}")
 
     # write stream to file
     Path(out_wav_path).parent.mkdir(parents=True, exist_ok=True)
     with open(out_wav_path, "wb") as f:
-        for chunk in resp.iter_content(chunk_size=8192):
+        for chunk in resp.iter_content(chunk_size=64 * 1024):
             if chunk:
                 f.write(chunk)
     # Ensure file is valid (pydub load check)
@@ -188,6 +207,33 @@ def coqui_synthesize_to_wav(text: str, model_name: str, out_wav_path: str):
         log.exception("Coqui synth error: %s", e)
         raise
 
+# ------------------------------
+# Piper synth function
+# ------------------------------
+_PIPER_VOICE = None
+
+
+def _init_piper_voice():
+    # loaded once per worker process
+    global _PIPER_VOICE
+    if _PIPER_VOICE is None and PIPER_AVAILABLE and PIPER_MODEL:
+        try:
+            _PIPER_VOICE = PiperVoice.load(PIPER_MODEL)
+        except Exception as e:
+            log.warning("Piper model load failed: %s -> %s", PIPER_MODEL, e)
+    return _PIPER_VOICE
+
+def piper_synthesize_to_wav(text: str, out_wav_path: str):
+    Path(out_wav_path).parent.mkdir(parents=True, exist_ok=True)
+    voice = _init_piper_voice()
+    if not voice:
+        raise RuntimeError("Piper unavailable or model failed to load")
+    with wave.open(out_wav_path, "wb") as wf:
+        # piper-tts >= 1.3 renamed synthesize(text, wav) to synthesize_wav
+        synth = getattr(voice, "synthesize_wav", None) or voice.synthesize
+        synth(text, wf)
+    return out_wav_path
+
 # ------------------------------
 # gTTS fallback
 # ------------------------------
@@ -211,14 +257,35 @@ def gtts_synthesize_to_wav(text: str, out_wav_path: str, sample_rate=22050):
             except: pass
         raise
 
+# ------------------------------
+# Silent fallback
+# ------------------------------
+def write_silent_wav(out_wav_path: str, duration_ms: int = 500, sample_rate: int = 22050):
+    """16-bit mono silence, written as one zeroed buffer."""
+    nframes = sample_rate * duration_ms // 1000
+    with wave.open(out_wav_path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(bytes(nframes * 2))
+    return out_wav_path
+
 # ------------------------------
 # Master synth wrapper
 # ------------------------------
 def synthesize_text_to_wav(text: str, preset: dict, out_wav_path: str):
     """
-    Try eleven -> coqui -> gtts -> silent.
+    Try eleven -> coqui -> piper -> gtts -> silent (piper first when TTS_ENGINE=piper).
     """
     Path(out_wav_path).parent.mkdir(parents=True, exist_ok=True)
+    piper_ready = PIPER_AVAILABLE and bool(PIPER_MODEL)
+    # 0) Piper, when selected as the primary engine
+    if TTS_ENGINE == "piper" and piper_ready:
+        try:
+            return piper_synthesize_to_wav(text, out_wav_path)
+        except Exception as e:
+            log.warning("Piper synth failed: %s (falling back)", e)
+
     # 1) ElevenLabs
     eleven_voice = preset.get("eleven_voice_id")
     if ELEVEN_API_KEY and eleven_voice:
@@ -235,18 +302,23 @@ def synthesize_text_to_wav(text: str, preset: dict, out_wav_path: str):
         except Exception as e:
             log.warning("Coqui synth failed: %s (falling back)", e)
 
-    # 3) gTTS fallback
+    # 3) Piper (local) before the network gTTS
+    if piper_ready and TTS_ENGINE != "piper":
+        try:
+            return piper_synthesize_to_wav(text, out_wav_path)
+        except Exception as e:
+            log.warning("Piper synth failed: %s (falling back)", e)
+
+    # 4) gTTS fallback
     if GTTS_AVAILABLE:
         try:
             return gtts_synthesize_to_wav(text, out_wav_path)
         except Exception as e:
             log.warning("gTTS synth failed: %s (falling back)", e)
 
-    # 4) silent fallback
+    # 5) silent fallback
     try:
-        silence = AudioSegment.silent(duration=500)  # 0.5s silent
-        silence.export(out_wav_path, format="wav")
-        return out_wav_path
+        return write_silent_wav(out_wav_path, duration_ms=500)  # 0.5s silent
     except Exception as e:
         log.exception("Failed to create silent wav fallback: %s", e)
         raise RuntimeError("No TTS available and cannot create fallback audio")
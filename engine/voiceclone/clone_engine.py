@@ -1,6 +1,6 @@
 import replicate
 import uuid
-import os
+from engine.downloads import download_file
 
 def clone_voice_and_generate(script_text, voice_sample_path):
     model = "tstramer/tortoise-tts"
@@ -20,6 +20,6 @@ def clone_voice_and_generate(script_text, voice_sample_path):
     audio_id = str(uuid.uuid4())[:8]
     save_path = f"static/videos/clone_audio_{audio_id}.wav"
 
-    os.system(f"wget {audio_url} -O {save_path}")
+    download_file(audio_url, save_path)
 
     return save_path
@@ -12,22 +12,37 @@ logging.basicConfig(level=logging.INFO)
 
 REDIS_URL = os.environ.get("REDIS_URL") or os.environ.get("CELERY_BROKER_URL") or os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 
-celery_app = Celery("visora_tasks", broker=REDIS_URL, backend=REDIS_URL)
+# No result backend: job state lives in services.job_store and nothing calls .get()
+celery_app = Celery("visora_tasks", broker=REDIS_URL)
 
 # optional: configuration
 celery_app.conf.update(
     task_serializer="json",
     result_serializer="json",
     accept_content=["json"],
+    task_ignore_result=True,
+    # reuse broker connections for publishes instead of dialing per send_task
+    broker_pool_limit=int(os.environ.get("CELERY_BROKER_POOL_LIMIT", 32)),
+    broker_transport_options={"visibility_timeout": int(os.environ.get("CELERY_VISIBILITY_TIMEOUT", 3600))},
     worker_prefetch_multiplier=1,
     task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # renders load Blender/TTS/torch; recycle the child to hand that memory back
+    worker_max_tasks_per_child=int(os.environ.get("CELERY_MAX_TASKS_PER_CHILD", 10)),
 )
 
-# define default queue
+# define default queue + dedicated queues for the heavy render task and the
+# I/O-bound S3 uploads (run by separate workers, see Procfile)
 celery_app.conf.task_default_queue = "celery"
 celery_app.conf.task_queues = (
     Queue("celery", Exchange("celery"), routing_key="celery"),
+    Queue("renderers", Exchange("renderers"), routing_key="renderers"),
+    Queue("uploads", Exchange("uploads"), routing_key="uploads"),
 )
+celery_app.conf.task_routes = {
+    "tasks.render_task.render_job_task": {"queue": "renderers"},
+    "tasks.upload_task.upload_job_video": {"queue": "uploads"},
+}
 
 # import tasks to register them (relative import)
 try:
@@ -35,12 +50,33 @@ try:
     logger.info("Imported tasks.render_task")
 except Exception:
     logger.exception("Failed importing tasks.render_task")
+try:
+    from tasks import upload_task  # noqa: F401
+except Exception:
+    logger.exception("Failed importing tasks.upload_task")
 
 # helper to enqueue job by id
 def enqueue_render_job(job_id: str):
     if not job_id:
         raise ValueError("job_id required")
     # call Celery task
-    result = celery_app.send_task("tasks.render_task.render_job_task", args=[job_id], queue="celery")
+    result = celery_app.send_task("tasks.render_task.render_job_task", args=[job_id], queue="renderers")
     logger.info("Enqueued job %s -> %s", job_id, result.id)
     return result.id
+
+def enqueue_render_jobs(job_ids):
+    """
+    Publish several render jobs over one pooled producer connection.
+    Returns {job_id: task_id}; task_id is None for jobs that failed to publish.
+    """
+    task_ids = {}
+    with celery_app.producer_or_acquire() as producer:
+        for job_id in job_ids:
+            try:
+                result = celery_app.send_task("tasks.render_task.render_job_task", args=[job_id], queue="renderers", producer=producer)
+                task_ids[job_id] = result.id
+            except Exception:
+                logger.exception("Failed to enqueue job %s", job_id)
+                task_ids[job_id] = None
+    logger.info("Enqueued %d jobs in one batch", len(task_ids))
+    return task_ids
@@ -0,0 +1,556 @@
+# services/job_store.py
+"""
+Job record persistence shared by the API routes and Celery tasks.
+
+Backends (JOB_STORE env):
+  file   (default) one JSON file per job in JOBS_DIR/<id>.json
+  sqlite one row per job in JOBS_DB, WAL journal; an empty database imports any
+         existing JOBS_DIR/*.json records on first open
+  redis  one hash per job (job:<id>) on REDIS_URL, indexed by update time in
+         the jobs:by_mtime sorted set; completed/failed jobs are also written
+         through to JOBS_DIR so they survive a Redis flush
+
+Records are stored as compact JSON (UTF-8, no indentation), via orjson when it is
+installed and the stdlib json module otherwise. File
+writes go to a per-process temp file and are swapped in with os.replace, so a
+reader never sees a half-written record. Set VISORA_FSYNC=1 to also fsync
+before the swap (only needed where the disk may lose power mid-write).
+
+update_job() is atomic per job on every backend (a single UPDATE on sqlite, WATCH/MULTI
+on redis, a striped flock under JOBS_DIR/.locks on files), so a Celery task and an API
+request patching the same job cannot lose each other's changes. A patch that would move
+a completed/failed job back to a non-terminal status is not applied, unless it is a
+compare-and-set on that exact status (update_job(..., if_status=)).
+"""
+import os
+import time
+import zlib
+import sqlite3
+import itertools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; update() then only serialises within a process
+    fcntl = None
+
+logger = logging.getLogger("visora_jobs")
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+JOBS_DIR = Path(os.environ.get("JOBS_DIR", BASE_DIR / "jobs"))
+JOBS_DIR.mkdir(parents=True, exist_ok=True)
+JOBS_DB = Path(os.environ.get("JOBS_DB", BASE_DIR / "jobs.db"))
+JOB_STORE = os.environ.get("JOB_STORE", "file").lower()
+REDIS_URL = os.environ.get("REDIS_URL") or os.environ.get("CELERY_BROKER_URL") or "redis://localhost:6379/0"
+RETENTION_DAYS = int(os.environ.get("FILE_RETENTION_DAYS", 7))
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+FSYNC = os.environ.get("VISORA_FSYNC", "0") == "1"
+# job files are small; bulk scans are bound by per-file open/read latency
+SCAN_WORKERS = int(os.environ.get("CLEANUP_WORKERS", 32))
+# parsed records kept for peek_job(), keyed on file identity so any rewrite invalidates
+PEEK_CACHE_SIZE = int(os.environ.get("JOB_PEEK_CACHE_SIZE", 10000))
+# file-store update() locks one of a fixed set of lock files, so they never need cleaning up
+LOCK_STRIPES = int(os.environ.get("JOB_LOCK_STRIPES", 64))
+
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(job_data: dict) -> bytes:
+        return orjson.dumps(job_data, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    import json
+
+    _loads = json.loads  # accepts bytes and str, like orjson.loads
+
+    def _dumps(job_data: dict) -> bytes:
+        # byte-for-byte the same shape as the orjson output, so the formats mix freely
+        return json.dumps(job_data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _merge_patch(target: dict, patch: dict) -> dict:
+    # RFC 7396 merge patch, the same semantics as SQLite's json_patch(): None deletes a key
+    for k, v in patch.items():
+        if v is None:
+            target.pop(k, None)
+        elif isinstance(v, dict):
+            cur = target.get(k)
+            target[k] = _merge_patch(cur if isinstance(cur, dict) else {}, v)
+        else:
+            target[k] = v
+    return target
+
+
+def _reopens_terminal(job: dict, patch: dict) -> bool:
+    # a late "started"/progress patch must not resurrect a finished job
+    return job.get("status") in TERMINAL_STATUSES and "status" in patch and patch["status"] not in TERMINAL_STATUSES
+
+
+def _rejects(job: dict, patch: dict, if_status: str) -> bool:
+    if job is None:
+        return True
+    # an explicit compare-and-set (e.g. restarting a failed job) may leave a terminal status
+    if if_status is not None:
+        return job.get("status") != if_status
+    return _reopens_terminal(job, patch)
+
+
+def _is_expired(job: dict, now: datetime, retention_days: int) -> bool:
+    # failed jobs go after 24 hours, everything else after the retention window
+    created_at = job.get("created_at")
+    if not created_at:
+        return False
+    age = now - datetime.fromisoformat(created_at)
+    return (job.get("status") == "failed" and age > timedelta(hours=24)) or age > timedelta(days=retention_days)
+
+
+class FileJobStore:
+    def __init__(self, jobs_dir: Path):
+        self.jobs_dir = jobs_dir
+        self._tmp_counter = itertools.count()
+        self._peek_cache = OrderedDict()  # job_id -> ((st_ino, st_mtime_ns), dict)
+        self._peek_lock = threading.Lock()
+        self._index = None  # (dir st_mtime_ns, [(mtime, path), ...] newest first)
+        self._update_lock = threading.Lock()  # only used without fcntl
+
+    def path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.json"
+
+    def read(self, job_id: str):
+        p = self.path(job_id)
+        if not p.exists():
+            return None
+        return _loads(p.read_bytes())
+
+    def peek(self, job_id: str):
+        try:
+            st = self.path(job_id).stat()
+        except FileNotFoundError:
+            return None
+        # os.replace gives every write a new inode, so this catches same-tick rewrites too
+        stamp = (st.st_ino, st.st_mtime_ns)
+        with self._peek_lock:
+            hit = self._peek_cache.get(job_id)
+            if hit and hit[0] == stamp:
+                self._peek_cache.move_to_end(job_id)
+                return hit[1]
+        try:
+            data = self.read(job_id)
+        except FileNotFoundError:
+            return None
+        if data is not None:
+            with self._peek_lock:
+                self._peek_cache[job_id] = (stamp, data)
+                self._peek_cache.move_to_end(job_id)
+                while len(self._peek_cache) > PEEK_CACHE_SIZE:
+                    self._peek_cache.popitem(last=False)
+        return data
+
+    def write(self, job_data: dict):
+        p = self.path(job_data["id"])
+        tmp = p.with_name(f"{p.name}.tmp.{os.getpid()}.{next(self._tmp_counter)}")
+        data = _dumps(job_data)
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+                if FSYNC:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp, p)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def write_many(self, jobs):
+        for job_data in jobs:
+            self.write(job_data)
+
+    @contextmanager
+    def _job_lock(self, job_id: str):
+        if fcntl is None:
+            with self._update_lock:
+                yield
+            return
+        # crc32 rather than hash(): the stripe must agree across processes
+        lock_dir = self.jobs_dir / ".locks"
+        lock_dir.mkdir(exist_ok=True)
+        stripe = zlib.crc32(job_id.encode("utf-8")) % LOCK_STRIPES
+        with open(lock_dir / f"{stripe}.lock", "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def update(self, job_id: str, patch: dict, if_status: str = None) -> bool:
+        with self._job_lock(job_id):
+            job = self.read(job_id)
+            if _rejects(job, patch, if_status):
+                return False
+            self.write(_merge_patch(job, patch))
+        return True
+
+    def delete(self, job_id: str):
+        self.path(job_id).unlink(missing_ok=True)
+        with self._peek_lock:
+            self._peek_cache.pop(job_id, None)
+
+    def _mtime_index(self):
+        # every write/delete renames or unlinks in jobs_dir, which bumps the directory's
+        # mtime, so an unchanged directory means the previous scan is still exact
+        stamp = os.stat(self.jobs_dir).st_mtime_ns
+        index = self._index
+        if index and index[0] == stamp:
+            return index[1]
+        entries = []
+        with os.scandir(self.jobs_dir) as it:
+            for e in it:
+                if e.name.endswith(".json"):
+                    try:
+                        entries.append((e.stat().st_mtime, e.path))
+                    except FileNotFoundError:
+                        continue
+        entries.sort(reverse=True)
+        # only reuse a scan once the directory has been quiet for a second: coarse
+        # filesystem timestamps can give two writes in the same tick the same mtime
+        if time.time_ns() - stamp > 1_000_000_000:
+            self._index = (stamp, entries)
+        return entries
+
+    def iter_raw(self, limit: int = 200, skip: int = 0):
+        # only the requested page is opened
+        for _, path in self._mtime_index()[skip:skip + limit]:
+            try:
+                with open(path, "rb") as f:
+                    yield f.read()
+            except OSError:
+                continue
+
+    def list(self, limit: int = 200, skip: int = 0):
+        items = []
+        for blob in self.iter_raw(limit, skip):
+            try:
+                items.append(_loads(blob))
+            except ValueError:
+                continue
+        return items
+
+    def _expire_file(self, path: str, now: datetime, retention_days: int) -> bool:
+        try:
+            with open(path, "rb") as f:
+                job = _loads(f.read())
+            if _is_expired(job, now, retention_days):
+                os.unlink(path)
+                return True
+        except Exception:
+            pass
+        return False
+
+    def purge_expired(self, now: datetime, retention_days: int) -> int:
+        # single scandir pass; reads + unlinks fan out over a thread pool
+        if not self.jobs_dir.is_dir():
+            return 0
+        with os.scandir(self.jobs_dir) as it:
+            candidates = [e.path for e in it if e.name.endswith(".json") and e.is_file()]
+        if not candidates:
+            return 0
+        with ThreadPoolExecutor(max_workers=min(SCAN_WORKERS, len(candidates))) as pool:
+            return sum(pool.map(lambda p: self._expire_file(p, now, retention_days), candidates))
+
+
+class SqliteJobStore:
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS jobs("
+        "id TEXT PRIMARY KEY, status TEXT, progress INT, created_at TEXT, updated_at REAL, data BLOB)"
+    )
+
+    def __init__(self, db_path: Path, import_dir: Path = None):
+        self.db_path = db_path
+        self.import_dir = import_dir
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        # connections must not cross a fork (gunicorn / celery prefork), so reopen per pid
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL" if FSYNC else "PRAGMA synchronous=NORMAL")
+            conn.execute(self.SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs(updated_at)")
+            if self.import_dir and conn.execute("SELECT 1 FROM jobs LIMIT 1").fetchone() is None:
+                self._import_files(conn)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _import_files(self, conn: sqlite3.Connection):
+        # one-off migration from the file store; OR IGNORE makes racing workers harmless
+        rows = []
+        for p in self.import_dir.glob("*.json"):
+            try:
+                blob = p.read_bytes()
+                job = _loads(blob)
+                rows.append((job["id"], job.get("status"), job.get("progress"),
+                             job.get("created_at"), p.stat().st_mtime, blob))
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+        if rows:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs(id, status, progress, created_at, updated_at, data) VALUES(?,?,?,?,?,?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+            logger.info("Imported %d job files from %s into %s", len(rows), self.import_dir, self.db_path)
+
+    def read(self, job_id: str):
+        with self._lock:
+            row = self._db().execute("SELECT data FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return _loads(row[0]) if row else None
+
+    peek = read
+
+    @staticmethod
+    def _row(job_data: dict, now: float):
+        return (job_data["id"], job_data.get("status"), job_data.get("progress"),
+                job_data.get("created_at"), now, _dumps(job_data))
+
+    def write(self, job_data: dict):
+        row = self._row(job_data, time.time())
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO jobs(id, status, progress, created_at, updated_at, data) VALUES(?,?,?,?,?,?)",
+                row,
+            )
+
+    def write_many(self, jobs):
+        # one transaction, so one WAL commit for the whole batch
+        now = time.time()
+        rows = [self._row(j, now) for j in jobs]
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO jobs(id, status, progress, created_at, updated_at, data) VALUES(?,?,?,?,?,?)",
+                    rows,
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def update(self, job_id: str, patch: dict, if_status: str = None) -> bool:
+        # one indexed UPDATE: no read/parse/rewrite round trip through Python
+        reopen = "status" in patch and patch["status"] not in TERMINAL_STATUSES
+        with self._lock:
+            cur = self._db().execute(
+                # json_patch() returns TEXT; keep the column BLOB so readers always get bytes
+                "UPDATE jobs SET data=CAST(json_patch(CAST(data AS TEXT), :p) AS BLOB), "
+                "status=coalesce(json_extract(:p, '$.status'), status), "
+                "progress=coalesce(json_extract(:p, '$.progress'), progress), updated_at=:t "
+                "WHERE id=:id AND CASE WHEN :if_status IS NULL "
+                "THEN NOT (:reopen AND coalesce(status IN ('completed', 'failed'), 0)) "
+                "ELSE status IS :if_status END",
+                {"p": _dumps(patch).decode("utf-8"), "t": time.time(), "id": job_id, "reopen": reopen,
+                 "if_status": if_status},
+            )
+        return cur.rowcount > 0
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._db().execute("DELETE FROM jobs WHERE id=?", (job_id,))
+
+    def iter_raw(self, limit: int = 200, skip: int = 0):
+        with self._lock:
+            rows = self._db().execute(
+                # the CAST also covers rows patched before updates stored BLOBs
+                "SELECT CAST(data AS BLOB) FROM jobs ORDER BY updated_at DESC LIMIT ? OFFSET ?", (limit, skip)
+            ).fetchall()
+        for r in rows:
+            yield r[0]
+
+    def list(self, limit: int = 200, skip: int = 0):
+        return [_loads(blob) for blob in self.iter_raw(limit, skip)]
+
+    def purge_expired(self, now: datetime, retention_days: int) -> int:
+        # created_at is naive ISO-8601, so string comparison orders correctly
+        failed_cutoff = (now - timedelta(hours=24)).isoformat()
+        cutoff = (now - timedelta(days=retention_days)).isoformat()
+        with self._lock:
+            cur = self._db().execute(
+                "DELETE FROM jobs WHERE created_at IS NOT NULL AND "
+                "((status='failed' AND created_at < ?) OR created_at < ?)",
+                (failed_cutoff, cutoff),
+            )
+        return cur.rowcount
+
+
+class RedisJobStore:
+    INDEX = "jobs:by_mtime"
+
+    def __init__(self, url: str, durable: FileJobStore):
+        import redis
+        # from_url keeps a connection pool shared by all threads in the process
+        self.r = redis.Redis.from_url(url, decode_responses=True)
+        self.durable = durable
+        self._watch_error = redis.WatchError
+
+    @staticmethod
+    def key(job_id: str) -> str:
+        return f"job:{job_id}"
+
+    def read(self, job_id: str):
+        raw = self.r.hget(self.key(job_id), "json")
+        if raw is None:
+            return self.durable.read(job_id)
+        return _loads(raw)
+
+    peek = read
+
+    def _queue_write(self, pipe, job_data: dict, now: float):
+        k = self.key(job_data["id"])
+        status = job_data.get("status") or ""
+        pipe.hset(k, mapping={
+            "json": _dumps(job_data),
+            "status": status,
+            "updated_at": now,
+        })
+        # same retention rules as housekeeping, enforced by key TTL
+        pipe.expire(k, 86400 if status == "failed" else RETENTION_DAYS * 86400)
+        pipe.zadd(self.INDEX, {job_data["id"]: now})
+
+    def write(self, job_data: dict):
+        self.write_many([job_data])
+
+    def write_many(self, jobs):
+        # every record in one pipeline round trip
+        now = time.time()
+        pipe = self.r.pipeline()
+        for job_data in jobs:
+            self._queue_write(pipe, job_data, now)
+        pipe.execute()
+        for job_data in jobs:
+            if job_data.get("status") in TERMINAL_STATUSES:
+                self.durable.write(job_data)
+
+    def update(self, job_id: str, patch: dict, if_status: str = None) -> bool:
+        # optimistic: MULTI fails if anyone else wrote the hash since WATCH, then retry
+        k = self.key(job_id)
+        with self.r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(k)
+                    raw = pipe.hget(k, "json")
+                    job = _loads(raw) if raw is not None else self.durable.read(job_id)
+                    if _rejects(job, patch, if_status):
+                        pipe.reset()
+                        return False
+                    job = _merge_patch(job, patch)
+                    pipe.multi()
+                    self._queue_write(pipe, job, time.time())
+                    pipe.execute()
+                    break
+                except self._watch_error:
+                    continue
+        if job.get("status") in TERMINAL_STATUSES:
+            self.durable.write(job)
+        return True
+
+    def delete(self, job_id: str):
+        pipe = self.r.pipeline()
+        pipe.delete(self.key(job_id))
+        pipe.zrem(self.INDEX, job_id)
+        pipe.execute()
+        self.durable.delete(job_id)
+
+    def iter_raw(self, limit: int = 200, skip: int = 0):
+        if limit <= 0:
+            return
+        ids = self.r.zrevrange(self.INDEX, skip, skip + limit - 1)
+        pipe = self.r.pipeline()
+        for job_id in ids:
+            pipe.hget(self.key(job_id), "json")
+        stale = []
+        for job_id, raw in zip(ids, pipe.execute()):
+            if raw is None:
+                # hash expired by TTL; drop its index entry on the way past
+                stale.append(job_id)
+                continue
+            yield raw.encode("utf-8")
+        if stale:
+            self.r.zrem(self.INDEX, *stale)
+
+    def list(self, limit: int = 200, skip: int = 0):
+        return [_loads(blob) for blob in self.iter_raw(limit, skip)]
+
+    def purge_expired(self, now: datetime, retention_days: int) -> int:
+        # live keys expire on their own; trim their index entries and sweep the
+        # write-through copies
+        self.r.zremrangebyscore(self.INDEX, 0, time.time() - retention_days * 86400)
+        return self.durable.purge_expired(now, retention_days)
+
+
+if JOB_STORE == "sqlite":
+    _store = SqliteJobStore(JOBS_DB, import_dir=JOBS_DIR)
+elif JOB_STORE == "redis":
+    _store = RedisJobStore(REDIS_URL, FileJobStore(JOBS_DIR))
+else:
+    _store = FileJobStore(JOBS_DIR)
+
+
+def read_job(job_id: str):
+    return _store.read(job_id)
+
+
+def peek_job(job_id: str):
+    """Like read_job, but may return a cached object shared between callers: do not mutate it."""
+    return _store.peek(job_id)
+
+
+def write_job(job_data: dict):
+    _store.write(job_data)
+
+
+def write_jobs(jobs):
+    """Store several records at once: one transaction (sqlite) or one pipeline (redis)."""
+    _store.write_many(jobs)
+
+
+def update_job(job_id: str, patch: dict, if_status: str = None) -> bool:
+    """
+    Atomically apply a JSON merge patch (None deletes a key) to a stored job. False if
+    it doesn't exist or the patch would move a completed/failed job to another status.
+    With if_status, the patch applies only while the job's status is exactly that (and
+    then may also move a finished job on, e.g. a manual restart of a failed one).
+    """
+    return _store.update(job_id, patch, if_status)
+
+
+def delete_job(job_id: str):
+    _store.delete(job_id)
+
+
+def list_jobs(limit: int = 200, skip: int = 0):
+    """Newest-updated first."""
+    return _store.list(limit, skip)
+
+
+def iter_job_blobs(limit: int = 200, skip: int = 0):
+    """Serialized job records (JSON bytes), newest-updated first, without parsing them."""
+    return _store.iter_raw(limit, skip)
+
+
+def purge_expired_jobs(retention_days: int, now: datetime = None) -> int:
+    return _store.purge_expired(now or datetime.utcnow(), retention_days)
@@ -1,4 +1,3 @@
-import boto3
 import os
 
 S3 = os.getenv("S3_BUCKET", "")
@@ -6,16 +5,42 @@ AWSID = os.getenv("AWS_ACCESS_KEY_ID", "")
 AWSKEY = os.getenv("AWS_SECRET_ACCESS_KEY", "")
 REGION = os.getenv("AWS_REGION", "us-east-1")
 
-def upload_to_s3_if_configured(local_path, key):
-    if not S3:
-        return None
+# built once per process; boto3 clients are thread-safe and keep their connection pool.
+# The pool must cover the multipart threads below times the uploader's thread pool,
+# otherwise parts queue for a connection (and urllib3 logs "pool is full").
+_S3 = None
+_TX = None
+if S3:
+    # boto3/botocore cost a noticeable chunk of import time and RSS; only pay for
+    # them in processes that actually upload (the API imports this module too)
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
 
-    s3 = boto3.client(
+    _S3 = boto3.client(
         "s3",
         aws_access_key_id=AWSID,
         aws_secret_access_key=AWSKEY,
-        region_name=REGION
+        region_name=REGION,
+        config=Config(
+            max_pool_connections=int(os.getenv("S3_MAX_POOL_CONNECTIONS", 32)),
+            retries={"max_attempts": 3, "mode": "standard"},
+            tcp_keepalive=True,
+        ),
+    )
+
+    # multipart (8 MB parts, 8 threads) for anything above 8 MB
+    _TX = TransferConfig(
+        multipart_threshold=8 * 1024 * 1024,
+        multipart_chunksize=8 * 1024 * 1024,
+        max_concurrency=8,
+        use_threads=True,
     )
 
-    s3.upload_file(local_path, S3, key, ExtraArgs={"ACL": "public-read", "ContentType": "video/mp4"})
+
+def upload_to_s3_if_configured(local_path, key):
+    if not S3:
+        return None
+
+    _S3.upload_file(local_path, S3, key, ExtraArgs={"ACL": "public-read", "ContentType": "video/mp4"}, Config=_TX)
     return f"https://{S3}.s3.{REGION}.amazonaws.com/{key}"
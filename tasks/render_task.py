@@ -4,91 +4,85 @@ Celery task that performs the rendering pipeline:
 - loads job metadata
 - calls engine.render_project(project_dict)
 - assembles mp4
-- uploads to S3 if configured
 - updates job file (success or failure)
+- hands the S3 upload (if configured) to tasks.upload_task on the uploads queue
 """
 import os
-import json
 import logging
-import traceback
 from pathlib import Path
 from datetime import datetime
 from services.celery_app import celery_app
+from services.job_store import read_job, update_job
+from services.storage import S3 as S3_BUCKET
 
 logger = logging.getLogger("visora_render")
 logging.basicConfig(level=logging.INFO)
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-JOBS_DIR = BASE_DIR / "jobs"
 OUTPUT_DIR = BASE_DIR / "public" / "videos"
-JOBS_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-# try import your engine render function
-TRY_ENGINE = None
-try:
-    # Expected API: engine.render_project(project_dict, out_path) -> path_to_mp4
-    from engine.cinematic_engine import CinematicEngine  # example
-    TRY_ENGINE = "cinematic"
-    logger.info("Using cinematic_engine")
-except Exception:
-    try:
-        from engine.render_engine import render_project as core_render
-        TRY_ENGINE = "render_project"
-        logger.info("Using render_engine.render_project")
-    except Exception:
-        TRY_ENGINE = None
-        logger.warning("No render engine found. Implement engine.cinematic_engine.CinematicEngine or engine.render_engine.render_project")
+# The engine stack (Blender/torch/ffmpeg wrappers) is resolved on the first render,
+# not at import: the web process imports this module via services.celery_app only
+# to enqueue, and must not pay for the engines in RSS or startup time.
+_ENGINE = None  # (kind, callable) once resolved
 
-# helper read/save job
-def read_job(job_id: str):
-    p = JOBS_DIR / f"{job_id}.json"
-    if not p.exists():
-        return None
-    with open(p, "r", encoding="utf-8") as f:
-        return json.load(f)
 
-def save_job(job_data: dict):
-    p = JOBS_DIR / f"{job_data['id']}.json"
-    with open(p, "w", encoding="utf-8") as f:
-        json.dump(job_data, f, ensure_ascii=False, indent=2)
+def _load_engine():
+    global _ENGINE
+    if _ENGINE is not None:
+        return _ENGINE
+    try:
+        # Expected API: engine.render_project(project_dict, out_path) -> path_to_mp4
+        from engine.cinematic_engine import CinematicEngine  # example
+        _ENGINE = ("cinematic", CinematicEngine)
+        logger.info("Using cinematic_engine")
+    except Exception:
+        try:
+            from engine.render_engine import render_project as core_render
+            _ENGINE = ("render_project", core_render)
+            logger.info("Using render_engine.render_project")
+        except Exception:
+            _ENGINE = (None, None)
+            logger.warning("No render engine found. Implement engine.cinematic_engine.CinematicEngine or engine.render_engine.render_project")
+    return _ENGINE
 
-# finalize helpers (also imported by app.py)
+# finalize helpers
+# Both patch the stored record rather than writing back a dict read earlier, so
+# updates made meanwhile (meta, upload URL) survive.
 def finalize_job_success(job_id: str, local_out: str):
-    job = read_job(job_id)
-    if not job:
+    # the mp4 is served locally until the upload task swaps in the S3 URL
+    video_url = f"{os.environ.get('BASE_URL','')}/public/videos/{job_id}.mp4"
+    if not update_job(job_id, {
+        "result": {"video_url": video_url},
+        "status": "completed",
+        "completed_at": datetime.utcnow().isoformat(),
+        "error": None,  # left over from an earlier failed run of a restarted job
+    }):
         logger.error("finalize_job_success: job not found %s", job_id)
         return False
-    # try upload to s3 if config present
-    s3_url = None
-    try:
-        from app import upload_to_s3_if_configured  # local import
-        s3_key = f"videos/{job_id}.mp4"
-        s3_url = upload_to_s3_if_configured(local_out, s3_key)
-    except Exception:
-        logger.exception("S3 upload helper failed")
+    logger.info("Job finalized success %s -> %s", job_id, video_url)
 
-    job["result"] = {"video_url": s3_url or f"{os.environ.get('BASE_URL','')}/public/videos/{job_id}.mp4"}
-    job["status"] = "completed"
-    job["completed_at"] = datetime.utcnow().isoformat()
-    save_job(job)
-    logger.info("Job finalized success %s -> %s", job_id, job["result"]["video_url"])
+    if S3_BUCKET:
+        try:
+            celery_app.send_task("tasks.upload_task.upload_job_video", args=[job_id, local_out], queue="uploads")
+        except Exception:
+            logger.exception("Failed to enqueue S3 upload for %s", job_id)
     return True
 
 def finalize_job_failed(job_id: str, error_msg: str):
-    job = read_job(job_id)
-    if not job:
+    if not update_job(job_id, {
+        "status": "failed",
+        "error": error_msg,
+        "completed_at": datetime.utcnow().isoformat(),
+    }):
         logger.error("finalize_job_failed: job not found %s", job_id)
         return False
-    job["status"] = "failed"
-    job["error"] = error_msg
-    job["completed_at"] = datetime.utcnow().isoformat()
-    save_job(job)
     logger.info("Job finalized failed %s", job_id)
     return True
 
 # Celery task
-@celery_app.task(name="tasks.render_task.render_job_task", bind=True)
+@celery_app.task(name="tasks.render_task.render_job_task", bind=True, acks_late=True, reject_on_worker_lost=True)
 def render_job_task(self, job_id: str):
     logger.info("Starting render job %s", job_id)
     job = read_job(job_id)
@@ -96,9 +90,11 @@ def render_job_task(self, job_id: str):
         logger.error("Job not found %s", job_id)
         return {"ok": False, "error": "job_not_found"}
 
-    # update job status
-    job["status"] = "started"
-    save_job(job)
+    # update job status (a patch, not a rewrite of the whole record); refused once
+    # the job is completed/failed, e.g. a redelivered task for a finished render
+    if not update_job(job_id, {"status": "started"}):
+        logger.warning("Job %s is already finished, not rendering", job_id)
+        return {"ok": False, "job_id": job_id, "error": "job_finished"}
 
     try:
         # prepare project dict expected by engine
@@ -113,13 +109,14 @@ def render_job_task(self, job_id: str):
 
         # choose engine call
         local_out = None
-        if TRY_ENGINE == "cinematic":
+        engine_kind, engine_impl = _load_engine()
+        if engine_kind == "cinematic":
             # example usage for CinematicEngine
-            eng = CinematicEngine(work_dir=None, debug=False)
+            eng = engine_impl(work_dir=None, debug=False)
             local_out = eng.render_project(project)  # should return path to mp4
-        elif TRY_ENGINE == "render_project":
+        elif engine_kind == "render_project":
             # direct function
-            local_out = core_render(project)
+            local_out = engine_impl(project)
         else:
             raise NotImplementedError("No rendering engine implemented on server.")
 
@@ -127,12 +124,12 @@ def render_job_task(self, job_id: str):
         if not local_out or not Path(local_out).exists():
             raise RuntimeError(f"Render did not produce output: {local_out}")
 
-        # finalize success (uploads to S3 if configured)
+        # finalize success (S3 upload is queued, not awaited)
         finalize_job_success(job_id, str(local_out))
         return {"ok": True, "job_id": job_id, "video": str(local_out)}
 
     except Exception as e:
+        # the traceback goes to the worker log; the job record (served by /job) keeps the message
         logger.exception("Render job failed %s", job_id)
-        tb = traceback.format_exc()
-        finalize_job_failed(job_id, f"{str(e)}\n{tb}")
+        finalize_job_failed(job_id, str(e))
         return {"ok": False, "job_id": job_id, "error": str(e)}
@@ -0,0 +1,26 @@
+# tasks/upload_task.py
+"""
+S3 upload of a finished render, run on the light `uploads` queue so the
+render worker is free for the next job as soon as the mp4 is on disk.
+"""
+import logging
+from services.celery_app import celery_app
+from services.job_store import update_job
+from services.storage import upload_to_s3_if_configured
+
+logger = logging.getLogger("visora_upload")
+
+
+@celery_app.task(name="tasks.upload_task.upload_job_video", bind=True, acks_late=True,
+                 autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def upload_job_video(self, job_id: str, local_out: str):
+    s3_url = upload_to_s3_if_configured(local_out, f"videos/{job_id}.mp4")
+    if not s3_url:
+        return {"ok": False, "job_id": job_id, "error": "s3_not_configured"}
+
+    # the job is already completed with the local URL; point it at S3 now
+    if not update_job(job_id, {"result": {"video_url": s3_url}}):
+        logger.error("upload_job_video: job not found %s", job_id)
+        return {"ok": False, "job_id": job_id, "error": "job_not_found"}
+    logger.info("Uploaded %s -> %s", job_id, s3_url)
+    return {"ok": True, "job_id": job_id, "video_url": s3_url}
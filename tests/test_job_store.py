@@ -0,0 +1,90 @@
+import gzip
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import services.job_store as job_store
+from api import admin_routes
+
+
+@pytest.fixture
+def sqlite_store(tmp_path, monkeypatch):
+    store = job_store.SqliteJobStore(tmp_path / "jobs.db")
+    monkeypatch.setattr(job_store, "_store", store)
+    return store
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(admin_routes.router)
+    return TestClient(app)
+
+
+def test_sqlite_update_keeps_blobs(sqlite_store):
+    job_store.write_job({"id": "a" * 32, "status": "queued"})
+    assert job_store.update_job("a" * 32, {"status": "started"})
+    blobs = list(job_store.iter_job_blobs())
+    assert blobs and all(isinstance(b, bytes) for b in blobs)
+
+
+def test_admin_jobs_after_sqlite_update(sqlite_store, client):
+    job_store.write_job({"id": "a" * 32, "status": "queued"})
+    job_store.update_job("a" * 32, {"status": "started", "progress": 10})
+
+    r = client.get("/admin/jobs?format=ndjson", headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200
+    assert "content-encoding" not in r.headers
+    assert [orjson.loads(line)["status"] for line in r.text.splitlines()] == ["started"]
+
+    # read the raw gzip bytes, not httpx's transparently decoded text
+    with client.stream("GET", "/admin/jobs", headers={"Accept-Encoding": "gzip"}) as r:
+        raw = b"".join(r.iter_raw())
+    assert r.headers["content-encoding"] == "gzip"
+    assert orjson.loads(gzip.decompress(raw))["jobs"][0]["progress"] == 10
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "file":
+        s = job_store.FileJobStore(tmp_path)
+    else:
+        s = job_store.SqliteJobStore(tmp_path / "jobs.db")
+    monkeypatch.setattr(job_store, "_store", s)
+    return s
+
+
+def test_mark_enqueued_does_not_undo_worker_updates(store):
+    from api.routes.video import _mark_enqueued
+
+    jid = "b" * 32
+    job_store.write_job({"id": jid, "status": "created"})
+    # the worker finished the job before the publisher got to mark it queued
+    job_store.update_job(jid, {"status": "failed", "error": "boom", "completed_at": "t"})
+    _mark_enqueued(jid, True)
+    _mark_enqueued(jid, False)
+    job = job_store.read_job(jid)
+    assert (job["status"], job["error"], job["completed_at"]) == ("failed", "boom", "t")
+    assert job["meta"] == {"enqueue_error": True}
+
+
+def test_mark_enqueued_queues_created_job(store):
+    from api.routes.video import _mark_enqueued
+
+    jid = "c" * 32
+    job_store.write_job({"id": jid, "status": "created"})
+    _mark_enqueued(jid, True)
+    assert job_store.read_job(jid)["status"] == "queued"
+
+
+def test_if_status_restarts_failed_job(store):
+    jid = "d" * 32
+    job_store.write_job({"id": jid, "status": "failed", "meta": {"k": 1}})
+    # a late tick may not reopen it, an explicit compare-and-set may
+    assert not job_store.update_job(jid, {"status": "started"})
+    assert not job_store.update_job(jid, {"status": "queued"}, if_status="created")
+    assert job_store.update_job(jid, {"status": "queued", "meta": {"manual_started": True}}, if_status="failed")
+    job = job_store.read_job(jid)
+    assert job["status"] == "queued" and job["meta"] == {"k": 1, "manual_started": True}
@@ -0,0 +1,58 @@
+import base64
+import hashlib
+import hmac
+import time
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import sd_routes
+
+SECRET = "whsec_" + base64.b64encode(b"k" * 24).decode()
+BODY = b'{"id":"p1","status":"succeeded","output":["https://example.com/a.png"]}'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(sd_routes, "_redis", fakeredis.FakeRedis())
+    monkeypatch.setattr(sd_routes, "SD_WEBHOOK_SECRET", "")
+    monkeypatch.setattr(sd_routes, "SD_WEBHOOK_TOKEN", "")
+    app = FastAPI()
+    app.include_router(sd_routes.router)
+    return TestClient(app)
+
+
+def _signed(body, ts=None):
+    ts = str(int(time.time()) if ts is None else ts)
+    key = base64.b64decode(SECRET.split("_", 1)[1])
+    sig = base64.b64encode(hmac.new(key, f"m1.{ts}.".encode() + body, hashlib.sha256).digest()).decode()
+    return {"webhook-id": "m1", "webhook-timestamp": ts, "webhook-signature": f"v1,{sig}"}
+
+
+def test_refused_without_configured_auth(client):
+    assert client.post("/sd/webhook", content=BODY).status_code == 401
+    assert sd_routes._redis.llen("sd:done:p1") == 0
+
+
+def test_token(client, monkeypatch):
+    monkeypatch.setattr(sd_routes, "SD_WEBHOOK_TOKEN", "t0k")
+    assert client.post("/sd/webhook?token=nope", content=BODY).status_code == 401
+    assert client.post("/sd/webhook?token=t0k", content=BODY).status_code == 200
+    assert sd_routes._redis.lrange("sd:done:p1", 0, -1) == [BODY]
+
+
+def test_signature(client, monkeypatch):
+    monkeypatch.setattr(sd_routes, "SD_WEBHOOK_SECRET", SECRET)
+    assert client.post("/sd/webhook", content=BODY, headers=_signed(b"{}")).status_code == 401
+    assert client.post("/sd/webhook", content=BODY, headers=_signed(BODY, ts=1)).status_code == 401
+    assert client.post("/sd/webhook", content=BODY, headers=_signed(BODY)).status_code == 200
+
+
+def test_oversized_body(client, monkeypatch):
+    monkeypatch.setattr(sd_routes, "SD_WEBHOOK_TOKEN", "t0k")
+    monkeypatch.setattr(sd_routes, "SD_WEBHOOK_MAX_BYTES", 64)
+    assert client.post("/sd/webhook?token=t0k", content=BODY).status_code == 413
+    # no Content-Length: the streamed read still stops at the limit
+    assert client.post("/sd/webhook?token=t0k", content=iter([BODY])).status_code == 413